@@ -0,0 +1,111 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+# Measures the startup (import) time of Lipik using `python -X importtime`,
+# and fails if it is more than the threshold.
+#
+# Run from the root of the repository:
+#     python3 Benchmarks/import_time.py [--threshold MILLISECONDS] [--top N]
+
+
+# Import standard library dependencies.
+import argparse
+from pathlib import Path
+import subprocess
+import sys
+
+
+# Modules to import. lipik.py runs only when executed, so importing it gives
+# the startup time of the whole pipeline.
+MODULES = ("lipik",)
+
+# Default maximum allowed startup time, in milliseconds.
+DEFAULT_THRESHOLD = 750
+
+
+def measure_import_time() -> list[tuple[int, int, str]]:
+    """
+    Import the modules in a fresh interpreter, and return the parsed report.
+
+    Each entry is (self time, cumulative time, module name), with times in
+    microseconds. Nested modules have their names indented, as in the report.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import {', '.join(MODULES)}"],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True, text=True, check=True
+    )
+
+    entries = []
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+
+    return entries
+# End of measure_import_time().
+
+
+def main() -> int:
+    """Print the slowest imports, and return 1 if the threshold is crossed."""
+
+    parser = argparse.ArgumentParser(
+        description="Measure the startup (import) time of Lipik."
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="maximum allowed startup time in milliseconds")
+    parser.add_argument("--top", type=int, default=15,
+                        help="number of slowest modules to show")
+    args = parser.parse_args()
+
+    entries = measure_import_time()
+
+    # Top-level imports have exactly one space before their names.
+    total_ms = sum(
+        cumulative for _, cumulative, name in entries
+        if not name.startswith("  ")
+    ) / 1000
+
+    print(f"Slowest {args.top} modules (cumulative time):")
+    for _, cumulative, name in sorted(entries, reverse=True,
+                                      key=lambda x: x[1])[:args.top]:
+        print(f"{cumulative / 1000:10.1f} ms  {name.strip()}")
+
+    print(f"\nTotal startup time: {total_ms:.1f} ms "
+          f"(threshold: {args.threshold:.1f} ms)")
+
+    if total_ms > args.threshold:
+        print("Startup time has regressed past the threshold!")
+        return 1
+
+    return 0
+# End of main().
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+# End of file.
@@ -0,0 +1,513 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+# Benchmarks the stages of the fill pipeline on recorded payloads, reporting
+# wall time, CPU time and peak memory of each stage. Synthetic inputs with
+# more states and districts can be made to see how each stage scales.
+#
+# Run from the root of the repository:
+#     python3 Benchmarks/stages.py [--payloads DIR] [--scale 1 10] [--repeat N]
+
+
+# Import standard library dependencies.
+import argparse
+from concurrent.futures import Future
+from contextlib import redirect_stdout
+import io
+import json
+from pathlib import Path
+import sys
+from tempfile import TemporaryDirectory
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+from xml.sax.saxutils import escape
+import zipfile
+
+# Make the repository importable when run as a script.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Import the stages.
+from Cases.cases import fill_cases  # noqa: E402
+from Cases.mohfw import parse_mohfw  # noqa: E402
+from Cases.mygov import parse_mygov  # noqa: E402
+from District.districts import fill_district_data, read_xlsx  # noqa: E402
+from District.gazetteer import load_gazetteer  # noqa: E402
+from Helpers import aliases, metrics, precompress, stage_cache  # noqa: E402
+from Helpers.fetch import REPLAY_FILENAMES  # noqa: E402
+from Helpers.fuzzy_find_name import (  # noqa: E402
+    UnresolvedNames, find_names, get_choices
+)
+from Helpers.stats_store import Region  # noqa: E402
+from lipik import make_pretty, write_outputs  # noqa: E402
+from Vaccination.mygov import fill_mygov_data  # noqa: E402
+from Vaccination.mygov_centers import fill_state_centers  # noqa: E402
+from Vaccination.vaccination import fill_vaccination  # noqa: E402
+
+
+class StageSkipped(Exception):
+    """Raised when a stage can't be run (say, due to a missing payload)."""
+    pass
+# End of StageSkipped.
+
+
+###############################################################################
+
+# Making the inputs.
+
+
+def load_payloads(payloads_dir: Path) -> dict[str, bytes]:
+    """Read the recorded payloads (with names as in Example/)."""
+
+    payloads = {}
+
+    for source, filename in REPLAY_FILENAMES.items():
+        if (path := payloads_dir / filename).exists():
+            payloads[source] = path.read_bytes()
+
+    return payloads
+# End of load_payloads().
+
+
+def make_xlsx(week: str, tables: list[list[list[Any]]]) -> bytes:
+    """Make a minimal district XLSX having the given week and tables."""
+
+    columns = (("C", "D", "E", "F", "G"),
+               ("J", "K", "L", "M", "N"),
+               ("Q", "R", "S", "T", "U"))
+
+    strings: list[str] = []
+    rows: dict[int, list[str]] = {7: [("B", week)]}
+
+    for table, cols in zip(tables, columns):
+        for j, data in enumerate(table + [["Grand Total"]], start=12):
+            rows.setdefault(j, []).extend(zip(cols, data))
+
+    def cell(ref: str, value: Any) -> str:
+        if isinstance(value, str):
+            strings.append(value)
+            return f'<c r="{ref}" t="s"><v>{len(strings) - 1}</v></c>'
+        return f'<c r="{ref}"><v>{value}</v></c>'
+
+    sheet_rows = "".join(
+        f'<row r="{j}">'
+        + "".join(cell(f"{col}{j}", value)
+                  for col, value in sorted(rows[j], key=lambda x: x[0])
+                  if value != "")
+        + "</row>"
+        for j in sorted(rows)
+    )
+
+    main_ns = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    rel_ns = ("http://schemas.openxmlformats.org/officeDocument/2006/"
+              "relationships")
+    pkg_ns = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+    files = {
+        "[Content_Types].xml": (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'content-types"><Default Extension="rels" ContentType="'
+            'application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/></Types>'
+        ),
+        "_rels/.rels": (
+            f'<Relationships xmlns="{pkg_ns}"><Relationship Id="rId1" '
+            f'Type="{rel_ns}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        "xl/workbook.xml": (
+            f'<workbook xmlns="{main_ns}" xmlns:r="{rel_ns}"><sheets>'
+            '<sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'<Relationships xmlns="{pkg_ns}">'
+            f'<Relationship Id="rId1" Type="{rel_ns}/worksheet" '
+            'Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{rel_ns}/sharedStrings" '
+            'Target="sharedStrings.xml"/></Relationships>'
+        ),
+        "xl/worksheets/sheet1.xml": (
+            f'<worksheet xmlns="{main_ns}"><sheetData>{sheet_rows}'
+            '</sheetData></worksheet>'
+        ),
+        "xl/sharedStrings.xml": (
+            f'<sst xmlns="{main_ns}">'
+            + "".join(f"<si><t>{escape(s)}</t></si>" for s in strings)
+            + "</sst>"
+        ),
+    }
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as xlsx:
+        for name, content in files.items():
+            xlsx.writestr(name, content)
+
+    return buffer.getvalue()
+# End of make_xlsx().
+
+
+def scale_payloads(payloads: dict[str, bytes],
+                   factor: int) -> dict[str, bytes]:
+    """
+    Make synthetic payloads having `factor` times the states and districts.
+
+    Copies of states are named like "Kerala 2", "Kerala 3", etc., and keep
+    the same abbreviation so that they get the same districts. Delhi and
+    Lakshadweep are special cased by name in fill_district_data(), hence
+    aren't copied. The PDF has a fixed layout, and hence isn't scaled.
+    """
+    if factor == 1:
+        return payloads
+
+    def copies(name: str) -> list[str]:
+        if not name or name.title() in ("Delhi", "Lakshadweep"):
+            return []  # Empty name is for national stats.
+        return [f"{name} {k}" for k in range(2, factor + 1)]
+
+    scaled = dict(payloads)
+
+    # MyGov cases are columnar, with each field being a dict of index -> value.
+    mygov = json.loads(payloads["mygov_cases"])
+    names = list(mygov["Name of State / UT"].values())
+    new_index = len(names)
+
+    for index, name in enumerate(names):
+        for new_name in copies(name):
+            for field, column in mygov.items():
+                if isinstance(column, dict):
+                    column[str(new_index)] = column[str(index)]
+            mygov["Name of State / UT"][str(new_index)] = new_name
+            new_index += 1
+
+    scaled["mygov_cases"] = json.dumps(mygov).encode()
+
+    # Lists of records, with state names in the given key.
+    for source, key in (("mohfw_cases", "state_name"),
+                        ("mygov_state_centers", "state_name"),
+                        ("mygov_district_centers", "state_name")):
+        records = json.loads(payloads[source])
+        new_records = []
+        for record in records:
+            for name in copies(record[key]):
+                new_records.append({**record, key: name})
+        scaled[source] = json.dumps(records + new_records).encode()
+
+    vaccination = json.loads(payloads["mygov_vaccination"])
+    vaccination["vacc_st_data"] += [
+        {**record, "st_name": name}
+        for record in vaccination["vacc_st_data"]
+        for name in copies(record["st_name"])
+    ]
+    scaled["mygov_vaccination"] = json.dumps(vaccination).encode()
+
+    # Districts XLSX. State name is only in the first row of its districts.
+    xlsx = read_xlsx(payloads["mohfw_xlsx"])
+    tables = []
+    for rows in xlsx["tables"]:
+        new_rows = list(rows)
+        for k in range(2, factor + 1):
+            state = ""
+            for data in rows:
+                state = data[0] or state
+                if copies(state):
+                    new_rows.append([f"{data[0]} {k}" if data[0] else ""]
+                                    + list(data[1:]))
+        tables.append(new_rows)
+
+    scaled["mohfw_xlsx"] = make_xlsx(xlsx["week"], tables)
+
+    return scaled
+# End of scale_payloads().
+
+
+def new_pretty(payloads: dict[str, bytes], output_root: Path) -> dict:
+    """Make a fresh `pretty` dict, with payloads ready as if fetched."""
+
+    pretty = make_pretty(output_root, None)
+    pretty["internal"]["payloads"] = {}
+
+    for source, content in payloads.items():
+        future = Future()
+        future.set_result(content)
+        pretty["internal"]["payloads"][source] = future
+
+    return pretty
+# End of new_pretty().
+
+
+###############################################################################
+
+# The stages.
+# Each stage has a preparation function, which takes the pretty dict and
+# returns the arguments for the run function (not timed).
+
+
+def prepare_filled(pretty: dict) -> tuple:
+    """States are created and cases filled, as the later stages expect."""
+    fill_cases(pretty)
+    return (pretty,)
+# End of prepare_filled().
+
+
+def prepare_parse_mygov(pretty: dict) -> tuple:
+    payload = pretty["internal"]["payloads"]["mygov_cases"].result()
+    return (pretty, json.loads(payload))
+# End of prepare_parse_mygov().
+
+
+def prepare_parse_mohfw(pretty: dict) -> tuple:
+    pretty, mygov = prepare_parse_mygov(pretty)
+    parse_mygov(pretty, mygov, fill_data=False)  # Only create the states.
+    payload = pretty["internal"]["payloads"]["mohfw_cases"].result()
+    return (pretty, json.loads(payload))
+# End of prepare_parse_mohfw().
+
+
+def prepare_find_names(pretty: dict) -> tuple:
+    """Names from MoHFW and district centers, with their candidates."""
+    fill_cases(pretty)
+
+    states = tuple(set(pretty.keys()) - {"All", "internal", "timestamp"})
+    queries = []
+
+    payload = pretty["internal"]["payloads"]["mohfw_cases"].result()
+    for data in json.loads(payload):
+        if data["state_name"]:
+            queries.append((data["state_name"], states))
+
+    state_district_map = load_gazetteer()["states"]
+
+    payload = pretty["internal"]["payloads"]["mygov_district_centers"].result()
+    centers = json.loads(payload)
+    state_names = find_names((data["state_name"] for data in centers), states)
+
+    for data in centers:
+        state = state_names[data["state_name"]]
+        candidates = tuple(state_district_map.get(pretty[state].abbr, ()))
+        if candidates:
+            queries.append((data["district_name"], candidates))
+
+    return (queries,)
+# End of prepare_find_names().
+
+
+def run_find_names(queries: list[tuple[str, tuple[str, ...]]]) -> None:
+    """Resolve all names in batches (one per candidate set), cold cache."""
+    get_choices.cache_clear()
+
+    batches: dict[tuple[str, ...], list[str]] = {}
+    for name, candidates in queries:
+        batches.setdefault(candidates, []).append(name)
+
+    for candidates, names in batches.items():
+        try:
+            find_names(names, candidates)
+        except UnresolvedNames:
+            pass
+# End of run_find_names().
+
+
+def prepare_write(pretty: dict) -> tuple:
+    """Run the whole pipeline, so that the outputs can be written."""
+    fill_cases(pretty)
+    fill_vaccination(pretty)
+    fill_district_data(pretty)
+
+    pretty["Miscellaneous"] = pretty.pop("Miscellaneous")
+    yesterday = pretty["internal"]["yesterday"]
+    output_root = pretty["internal"]["output_root"]
+    stats = pretty["internal"].pop("stats")
+    old_filename = pretty["internal"]["old_filename"]
+    del pretty["internal"]
+
+    # Copies of the states share the abbreviations (see scale_payloads()),
+    # but the files of the regions are named by them. So number them, like
+    # "KL", "KL2", "KL3", etc.
+    seen: dict[str, int] = {}
+    for region in pretty.values():
+        if isinstance(region, Region):
+            if (copies := seen.get(region.abbr, 0)):
+                seen[region.abbr] = copies + 1
+                region.abbr += str(copies + 1)
+            else:
+                seen[region.abbr] = 1
+
+    return (stats.to_pretty(pretty), yesterday, output_root, old_filename)
+# End of prepare_write().
+
+
+def prepare_mohfw_pdf(pretty: dict) -> tuple:
+    """Needs the recorded PDF, skip if not available."""
+    if "mohfw_vaccination" not in pretty["internal"]["payloads"]:
+        raise StageSkipped("no recorded PDF")
+    return prepare_filled(pretty)
+# End of prepare_mohfw_pdf().
+
+
+def run_mohfw_pdf(pretty: dict) -> None:
+    from Vaccination.mohfw import fill_mohfw_data
+    fill_mohfw_data(pretty)
+# End of run_mohfw_pdf().
+
+
+STAGES: list[tuple[str, Optional[Callable], Callable]] = [
+    ("fill_cases", None, fill_cases),
+    ("parse_mygov", prepare_parse_mygov, parse_mygov),
+    ("parse_mohfw", prepare_parse_mohfw, parse_mohfw),
+    ("fill_mygov_data", prepare_filled, fill_mygov_data),
+    ("fill_mohfw_data", prepare_mohfw_pdf, run_mohfw_pdf),
+    ("fill_state_centers", prepare_filled, fill_state_centers),
+    ("read_xlsx", None,
+     lambda pretty: read_xlsx(pretty["internal"]["payloads"]["mohfw_xlsx"]
+                              .result())),
+    ("fill_district_data", prepare_filled, fill_district_data),
+    ("find_names", prepare_find_names, run_find_names),
+    ("write_outputs", prepare_write, write_outputs),
+]
+
+
+###############################################################################
+
+# Measuring.
+
+
+def measure(
+    payloads: dict[str, bytes],
+    prepare: Optional[Callable],
+    run: Callable,
+    repeat: int
+) -> tuple[float, float, float, bool]:
+    """
+    Returns the best wall time, best CPU time (both in ms) and peak memory of
+    the stage (in MiB). Memory is measured in a separate run, as tracemalloc
+    slows down the code a lot.
+
+    tracemalloc can't see the worker processes (see Helpers/worker.py), so if
+    the stage ran in a worker, the peak RSS of the worker is returned as the
+    memory instead. The last value tells if it is so.
+    """
+    wall_times, cpu_times = [], []
+
+    for i in range(repeat + 1):
+        # The stages print progress, which would clutter the report.
+        with TemporaryDirectory() as tmp, redirect_stdout(io.StringIO()):
+            # Don't let the stage cache skip the parsing, the aliases
+            # learned in earlier runs skip the name resolution, the digests
+            # of earlier runs skip the compression, or the PDF templates skip
+            # the grid detection (passed on, as the PDF is parsed in a
+            # worker).
+            stage_cache.CACHE_DIR = Path(tmp) / "cache"
+            aliases.ALIAS_FILE = Path(tmp) / "aliases.json"
+            precompress.DIGEST_FILE = Path(tmp) / "compressed.json"
+            aliases.load_aliases()
+            pretty = new_pretty(payloads, Path(tmp))
+            pretty["internal"]["pdf_template_file"] = (
+                Path(tmp) / "pdf_templates.json"
+            )
+            args = prepare(pretty) if prepare else (pretty,)
+            metrics.start_run()  # Only the counters of the stage.
+
+            if i < repeat:
+                wall, cpu = time.perf_counter(), time.process_time()
+                run(*args)
+                wall_times.append(time.perf_counter() - wall)
+                cpu_times.append(time.process_time() - cpu)
+            else:
+                tracemalloc.start()
+                run(*args)
+                peak = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+
+                worker_peaks = [
+                    value for name, value
+                    in metrics.get_metrics()["counters"].items()
+                    if name.startswith("peak_rss_kb/")
+                ]
+
+    in_worker = bool(worker_peaks)
+    if in_worker:
+        peak = max(worker_peaks) / 1024
+
+    return min(wall_times) * 1000, min(cpu_times) * 1000, peak, in_worker
+# End of measure().
+
+
+def main() -> None:
+    """Benchmark all the stages for each scale, and print the report."""
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the stages of the fill pipeline."
+    )
+    parser.add_argument("--payloads", type=Path, default=Path("./Example"),
+                        help="directory of recorded payloads "
+                             "(default: ./Example)")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10],
+                        help="multiply states and districts by these "
+                             "factors (default: 1 10)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="times to run each stage, best one is reported")
+    parser.add_argument("--stage", action="append",
+                        help="run only the given stage (can be repeated)")
+    args = parser.parse_args()
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if min(args.scale) < 1:
+        parser.error("--scale factors must be at least 1")
+
+    original_cache_dir = stage_cache.CACHE_DIR
+    original_alias_file = aliases.ALIAS_FILE
+    original_digest_file = precompress.DIGEST_FILE
+    recorded = load_payloads(args.payloads)
+
+    for factor in args.scale:
+        payloads = scale_payloads(recorded, factor)
+
+        print(f"\nScale: {factor}x states and districts")
+        print(f"{'Stage':<20} {'Wall (ms)':>10} {'CPU (ms)':>10} "
+              f"{'Peak (MiB)':>11}")
+
+        for name, prepare, run in STAGES:
+            if args.stage and name not in args.stage:
+                continue
+
+            try:
+                wall, cpu, peak, in_worker = measure(payloads, prepare, run,
+                                                     args.repeat)
+            except StageSkipped as e:
+                print(f"{name:<20} skipped ({e})")
+                continue
+
+            print(f"{name:<20} {wall:>10.1f} {cpu:>10.1f} {peak:>11.2f}"
+                  + (" (RSS of worker)" if in_worker else ""))
+
+    stage_cache.CACHE_DIR = original_cache_dir
+    aliases.ALIAS_FILE = original_alias_file
+    precompress.DIGEST_FILE = original_digest_file
+# End of main().
+
+
+if __name__ == "__main__":
+    main()
+
+
+# End of file.
@@ -21,12 +21,16 @@
 
 
 # Import standard library dependencies.
-import json
 from typing import Any
 
 # Import external dependencies.
 import pendulum
-import requests
+
+# Import helper functions.
+from Helpers.fetch import get_payload
+from Helpers import json_io
+from Helpers.metrics import count, span
+from Helpers.stats_store import CASE_FIELDS, CONFIRMED
 
 # Import the main filling functions.
 from .mohfw import parse_mohfw
@@ -42,9 +46,8 @@ def set_yesterday_to_day_before(pretty: dict[str, Any]) -> None:
     pretty["internal"]["yesterday"] = yesterday
     pretty["internal"]["day_before_yesterday"] = day_before_yesterday
     pretty["internal"]["old_filename"] = (
-        "../saarani/Daily/"
-        + day_before_yesterday.format("YYYY_MM_DD")
-        + ".json"
+        pretty["internal"]["output_root"] / "Daily"
+        / (day_before_yesterday.format("YYYY_MM_DD") + ".json")
     )
 
     pretty["timestamp"]["cases"]["date"] = yesterday.format("DD MMM YYYY")
@@ -53,7 +56,7 @@ def set_yesterday_to_day_before(pretty: dict[str, Any]) -> None:
 
 def fill_cases(pretty: dict[str, Any]) -> None:
     """
-    Fetches data from MyGov and MoHFW, and fills in the `pretty` dict.
+    Gets data from MyGov and MoHFW, and fills in the `pretty` dict.
 
     If MyGov data is outdated, the internal bool is set to False, and MoHFW
     data is used.
@@ -61,29 +64,36 @@ def fill_cases(pretty: dict[str, Any]) -> None:
     If current data is same as previous data, internal `yesterday` is
     decremented by 1.
     """
-    mohfw = requests.get(pretty["internal"]["mohfw_cases"]).json()
-    mygov = requests.get(pretty["internal"]["mygov_cases"]).json()
+    mohfw = json_io.loads(get_payload(pretty, "mohfw_cases"))
+    mygov = json_io.loads(get_payload(pretty, "mygov_cases"))
+
+    count("rows_parsed/mohfw_cases", len(mohfw))
+    count("rows_parsed/mygov_cases", len(mygov["Name of State / UT"]))
 
     # 0th is A&N Islands. Check total cases, it cannot decrease with time.
     if mygov["Total Confirmed cases"]["0"] < mohfw[0]["new_positive"]:
         # MyGov data is outdated compared to the MoHFW one.
         print("Using MoHFW data.")
         pretty["internal"]["use_mygov"] = False
-        parse_mygov(pretty, mygov, fill_data=False)
-        parse_mohfw(pretty, mohfw)
+        with span("parse/mygov_cases"):
+            parse_mygov(pretty, mygov, fill_data=False)
+        with span("parse/mohfw_cases"):
+            parse_mohfw(pretty, mohfw)
         return
 
     # else:
     # Parse MyGov data, and add reconciled death data from MoHFW data.
     print("Using MyGov data.")
-    parse_mygov(pretty, mygov)
-    parse_mohfw(pretty, mohfw, reconciliation_only=True)
+    with span("parse/mygov_cases"):
+        parse_mygov(pretty, mygov)
+    with span("parse/mohfw_cases"):
+        parse_mohfw(pretty, mohfw, reconciliation_only=True)
 
     # Check if we have 2 day old data instead of 1 day old.
 
     try:
-        with open(pretty["internal"]["old_filename"]) as f:
-            old_data = json.load(f)  # Day before yesterday's data.
+        # Day before yesterday's data.
+        old_data = json_io.load(pretty["internal"]["old_filename"])
 
     except FileNotFoundError:
         # We don't have previous data, so can't figure out if we are indeed
@@ -96,7 +106,11 @@ def fill_cases(pretty: dict[str, Any]) -> None:
             set_yesterday_to_day_before(pretty)
 
     else:
-        if pretty["All"]["confirmed"] == old_data["All"]["confirmed"]:
+        stats = pretty["internal"]["stats"]
+        confirmed = stats.cases[pretty["All"].index, CONFIRMED].tolist()
+
+        if confirmed == [old_data["All"]["confirmed"][field]
+                         for field in CASE_FIELDS]:
             # Total cases yesterday == total cases day before yesterday.
             # This is impossible, and implies we have the latter.
             set_yesterday_to_day_before(pretty)
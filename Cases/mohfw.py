@@ -24,10 +24,24 @@
 from typing import Any, Union
 
 # Import external dependencies.
+import numpy as np
 import pendulum
 
-# Import helper function.
-from Helpers.fuzzy_find_name import find_name
+# Import helper functions.
+from Helpers.aliases import resolve_names
+from Helpers.stats_store import (
+    CASE_FIELDS, CASE_METRICS, CURRENT, DEATHS, DELTA, PREVIOUS, StatsStore
+)
+
+
+# Keys of the current and previous counts of the cases, in the order of
+# CASE_METRICS (confirmed, active, recovered, deaths).
+CASE_KEYS = (
+    ("new_positive", "positive"),
+    ("new_active", "active"),
+    ("new_cured", "cured"),
+    ("new_death", "death"),
+)
 
 
 def convert_to_int(n: Union[int, str]) -> int:
@@ -49,76 +63,51 @@ def parse_mohfw(
     """
     Sets data according to the given JSON data fetched from MoHFW.
     """
+    stats: StatsStore = pretty["internal"]["stats"]
+
     pretty_states_set = set(pretty.keys()) - {"All", "internal", "timestamp"}
     pretty_states_tuple = tuple(pretty_states_set)
 
-    for data in mohfw:
-        if data["state_name"] in pretty_states_set:
-            state = data["state_name"]
-        elif not data["state_name"]:  # Empty str implies national stats.
-            state = "All"
-        else:
-            state = find_name(data["state_name"], pretty_states_tuple)
-
-        pretty[state]["deaths"]["reconciled"] = convert_to_int(
-                                                    data["death_reconsille"])
-
-        if reconciliation_only:
-            continue
-
-        # Each stat has case counts : current day, previous day, and new cases.
-        # Ratio is calculated and stored for all, except confirmed (obviously).
-
-        # Confirmed cases:
+    # Match all the state names to ours at once.
+    states = resolve_names(
+        "mohfw_cases",
+        (data["state_name"] for data in mohfw if data["state_name"]),
+        pretty_states_tuple
+    )
 
-        state_confirmed = pretty[state]["confirmed"]
-        confirmed = convert_to_int(data["new_positive"])
-        prev_confirmed = convert_to_int(data["positive"])
-        delta_confirmed = confirmed - prev_confirmed
+    # Rows of the regions of the records (empty name implies national stats).
+    names = [states[data["state_name"]] if data["state_name"] else "All"
+             for data in mohfw]
+    rows = np.array([pretty[name].index for name in names], dtype=np.intp)
 
-        state_confirmed["current"] = confirmed
-        state_confirmed["previous"] = prev_confirmed
-        state_confirmed["delta"] = delta_confirmed
+    # Helper function, gets the column of a key as an array.
+    def column(key: str) -> np.ndarray:
+        return np.fromiter((convert_to_int(data[key]) for data in mohfw),
+                           dtype=np.int64, count=len(mohfw))
+    # End of column().
 
-        # Active cases:
+    stats.reconciled[rows] = column("death_reconsille")
 
-        state_active = pretty[state]["active"]
-        active = convert_to_int(data["new_active"])
-        prev_active = convert_to_int(data["active"])
-        delta_active = active - prev_active
-
-        state_active["current"] = active
-        state_active["previous"] = prev_active
-        state_active["delta"] = delta_active
-        state_active["ratio_pc"] = round((100 * active) / confirmed, 5)
-
-        # Recovered cases:
-
-        state_recovered = pretty[state]["recovered"]
-        recovered = convert_to_int(data["new_cured"])
-        prev_recovered = convert_to_int(data["cured"])
-        delta_recovered = recovered - prev_recovered
+    if reconciliation_only:
+        return
 
-        state_recovered["current"] = recovered
-        state_recovered["previous"] = prev_recovered
-        state_recovered["delta"] = delta_recovered
-        state_recovered["ratio_pc"] = round((100 * recovered) / confirmed, 5)
+    # Each stat has case counts : current day, previous day, and new cases.
+    # Ratio is calculated and stored for all, except confirmed (obviously).
 
-        # Deaths:
+    cases = np.empty((len(mohfw), len(CASE_METRICS), len(CASE_FIELDS)),
+                     dtype=np.int64)
 
-        state_deaths = pretty[state]["deaths"]
-        deaths = convert_to_int(data["new_death"])
-        prev_deaths = convert_to_int(data["death"])
-        delta_deaths = convert_to_int(data["total"])
+    for metric, (key_current, key_previous) in enumerate(CASE_KEYS):
+        cases[:, metric, CURRENT] = column(key_current)
+        cases[:, metric, PREVIOUS] = column(key_previous)
+        cases[:, metric, DELTA] = (cases[:, metric, CURRENT]
+                                   - cases[:, metric, PREVIOUS])
 
-        state_deaths["current"] = deaths
-        state_deaths["previous"] = prev_deaths
-        state_deaths["delta"] = delta_deaths
-        state_deaths["ratio_pc"] = round((100 * deaths) / confirmed, 5)
-    # End of for loop.
+    # Change in deaths is given separately.
+    cases[:, DEATHS, DELTA] = column("total")
 
-    if reconciliation_only:
-        return
+    stats.cases[rows] = cases
+    stats.set_ratios(rows)
 
     # Store timestamps.
     pretty["timestamp"]["cases"] = {
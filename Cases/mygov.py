@@ -21,12 +21,27 @@
 
 
 # Import standard library dependencies.
-import copy
 from typing import Any, Union
 
 # Import external dependencies.
+import numpy as np
 import pendulum
 
+# Import helper functions.
+from Helpers.stats_store import CASE_FIELDS, CASE_METRICS, StatsStore
+
+
+# Keys of the columns of current, previous and new counts of the cases, in the
+# order of CASE_METRICS (confirmed, active, recovered, deaths).
+CASE_KEYS = (
+    ("Total Confirmed cases", "last_confirmed_covid_cases",
+     "diff_confirmed_covid_cases"),
+    ("Active", "last_active_covid_cases", "diff_active_covid_cases"),
+    ("Cured/Discharged/Migrated", "last_cured_discharged",
+     "diff_cured_discharged"),
+    ("Death", "last_death", "diff_death"),
+)
+
 
 def parse_mygov(
     pretty: dict[str, Any],  # Formatted dict.
@@ -36,11 +51,12 @@ def parse_mygov(
     """
     Sets data according to the given JSON data fetched from MyGov.
     """
+    stats: StatsStore = pretty["internal"]["stats"]
 
     # Get names of all states (Dicts are ordered in Python 3.7+).
     state_names = list(mygov["Name of State / UT"].values())
 
-    # Make dict for each state, with its general information.
+    # Make record for each state, with its general information.
     for index, (state, abbr, hindi, helpline, donate) in enumerate(
         zip(
             state_names,
@@ -59,103 +75,43 @@ def parse_mygov(
             state = "Telangana"
             state_names[index] = "Telangana"
 
-        pretty[state] = copy.deepcopy(pretty["All"])
-
-        pretty[state]["abbr"] = abbr          # 2 letter abbreviation.
-        pretty[state]["hindi"] = hindi        # Hindi name; Useful for l10n.
-        pretty[state]["helpline"] = helpline  # State helpline for COVID.
-        pretty[state]["donate"] = donate      # For donating to state funds.
+        pretty[state] = stats.add_region(
+            abbr,      # 2 letter abbreviation.
+            hindi,     # Hindi name; Useful for l10n.
+            helpline,  # State helpline for COVID.
+            donate     # For donating to state funds.
+        )
 
     # If asked not to fill stats, we are done here.
     if not fill_data:
         return
 
-    # For setting in national stats.
-    national_confirmed = pretty["All"]["confirmed"]
-    national_active = pretty["All"]["active"]
-    national_recovered = pretty["All"]["recovered"]
-    national_deaths = pretty["All"]["deaths"]
-
-    # Add cases data to state dicts.
-    for (
-            state,
-            confirmed, active, recovered, deaths,
-            prev_confirmed, prev_active, prev_recovered, prev_deaths,
-            delta_confirmed, delta_active, delta_recovered, delta_deaths
-        ) in zip(
-            state_names,
+    # Convert the columns of the counts to an array of (state, case metric,
+    # case field). Each stat has case counts : current day, previous day, and
+    # new cases.
 
-            map(int, mygov["Total Confirmed cases"].values()),
-            map(int, mygov["Active"].values()),
-            map(int, mygov["Cured/Discharged/Migrated"].values()),
-            map(int, mygov["Death"].values()),
+    num_states = len(state_names)
+    cases = np.empty((num_states, len(CASE_METRICS), len(CASE_FIELDS)),
+                     dtype=np.int64)
 
-            map(int, mygov["last_confirmed_covid_cases"].values()),
-            map(int, mygov["last_active_covid_cases"].values()),
-            map(int, mygov["last_cured_discharged"].values()),
-            map(int, mygov["last_death"].values()),
+    for metric, keys in enumerate(CASE_KEYS):
+        for field, key in enumerate(keys):
+            cases[:, metric, field] = np.fromiter(
+                map(int, mygov[key].values()), dtype=np.int64, count=num_states
+            )
 
-            map(int, mygov["diff_confirmed_covid_cases"].values()),
-            map(int, mygov["diff_active_covid_cases"].values()),
-            map(int, mygov["diff_cured_discharged"].values()),
-            map(int, mygov["diff_death"].values())
-    ):
-        # Each stat has case counts : current day, previous day, and new cases.
-        # Ratio is calculated and stored for all, except confirmed (obviously).
-
-        state_confirmed = pretty[state]["confirmed"]
-        state_confirmed["current"] = confirmed
-        state_confirmed["previous"] = prev_confirmed
-        state_confirmed["delta"] = delta_confirmed
-
-        state_active = pretty[state]["active"]
-        state_active["current"] = active
-        state_active["previous"] = prev_active
-        state_active["delta"] = delta_active
-        state_active["ratio_pc"] = round((100 * active) / confirmed, 5)
-
-        state_recovered = pretty[state]["recovered"]
-        state_recovered["current"] = recovered
-        state_recovered["previous"] = prev_recovered
-        state_recovered["delta"] = delta_recovered
-        state_recovered["ratio_pc"] = round((100 * recovered) / confirmed, 5)
-
-        state_deaths = pretty[state]["deaths"]
-        state_deaths["current"] = deaths
-        state_deaths["previous"] = prev_deaths
-        state_deaths["delta"] = delta_deaths
-        state_deaths["ratio_pc"] = round((100 * deaths) / confirmed, 5)
-
-        # Add to the total national count.
-
-        national_confirmed["current"] += confirmed
-        national_confirmed["previous"] += prev_confirmed
-        national_confirmed["delta"] += delta_confirmed
-
-        national_active["current"] += active
-        national_active["previous"] += prev_active
-        national_active["delta"] += delta_active
-
-        national_recovered["current"] += recovered
-        national_recovered["previous"] += prev_recovered
-        national_recovered["delta"] += delta_recovered
-
-        national_deaths["current"] += deaths
-        national_deaths["previous"] += prev_deaths
-        national_deaths["delta"] += delta_deaths
-    # End of for loop.
-
-    # Calculate ratios for the total national counts, with precision of 5.
-    national_total = national_confirmed["current"]
-    national_active["ratio_pc"] = round(
-        (100 * national_active["current"]) / national_total, 5
-    )
-    national_recovered["ratio_pc"] = round(
-        (100 * national_recovered["current"]) / national_total, 5
-    )
-    national_deaths["ratio_pc"] = round(
-        (100 * national_deaths["current"]) / national_total, 5
-    )
+    # Add cases data to state rows, and to the total national count.
+    # Ratio is calculated and stored for all, except confirmed (obviously).
+
+    rows = np.array([pretty[state].index for state in state_names],
+                    dtype=np.intp)
+    national = pretty["All"].index
+
+    stats.cases[rows] = cases
+    stats.cases[national] += cases.sum(axis=0)
+
+    stats.set_ratios(rows)
+    stats.set_ratios(national)
 
     # Store timestamps.
     pretty["timestamp"]["cases"] = {
@@ -20,35 +20,15 @@
 ###############################################################################
 
 
+# Import helper functions.
+from .gazetteer import load_gazetteer
+
+
 def district_name_fixer(district, state) -> str:
     """Fix / Change district names."""
 
-    change_names = {  # For typos/old/long/short -> new name map.
-        "Kawardha": "Kabeerdham",
-        "BBMP": "Bengaluru Urban",
-        "Sri Potti Sriramulu Nellore": "S.P.S. Nellore",
-        "Gulbarga": "Kalaburagi",
-        "Aranthangi": "Pudukkottai",
-        "Attur": "Salem",
-        "Cheyyar": "Tiruvannamalai",
-        "Kovilpatti": "Thoothukkudi",
-        "Palani": "Dindigul",
-        "Paramakudi": "Ramanathapuram",
-        "Poonamallee": "Thiruvallur",
-        "Sivakasi": "Virudhunagar",
-        "Tuticorin": "Thoothukkudi",
-        "Dibang Valley": "Upper Dibang Valley",
-        "Kamrup Metro": "Kamrup Metropolitan",
-        "Baleshwar": "Balasore",
-        "East Nimar": "Khandwa",
-        "Sonepur": "Subarnapur",
-        "Korea": "Koriya",
-        "Diamond Harbor HD (S 24 Parganas)": "South 24 Parganas",
-        "Nandigram HD (Purba Medinipore)": "Purba Medinipur",
-        "Shahid Bhagat Singh Nagar": "SBS Nagar",
-        "Dohad": "Dahod",
-        "Agar": "Agar Malwa",
-    }
+    # For typos/old/long/short -> new name map.
+    change_names = load_gazetteer()["district_renames"]
 
     if district in change_names:
         return change_names[district]
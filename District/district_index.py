@@ -0,0 +1,125 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from typing import Iterable, Optional
+
+# Import helper functions.
+from Helpers.aliases import resolve_names
+from Helpers.fuzzy_find_name import UnresolvedNames
+from .gazetteer import normalize
+
+
+class DistrictIndex:
+    """
+    Index of the districts of all states, built once per run.
+
+    Maps the normalized names to the canonical (state, district) pairs, so
+    that exact lookups are just a dict access. Districts can be added as we
+    come across them, and only that state's entry is updated.
+
+    The tuple of names of a state (the candidates passed to `resolve_names()`
+    for fuzzy matching) is built only when needed, and kept till a district
+    is added to the state.
+    """
+
+    __slots__ = ("_index", "_names", "_tuples")
+
+    def __init__(self, districts: dict[str, dict[str, str]]) -> None:
+        """
+        Make the index from {state: {normalized name: district}}, i.e. the
+        prebuilt index of the gazetteer (keyed by state names).
+        """
+
+        # (state, normalized district name) => (state, district)
+        self._index: dict[tuple[str, str], tuple[str, str]] = {}
+
+        self._names: dict[str, list[str]] = {}  # Canonical names, in order.
+        self._tuples: dict[str, tuple[str, ...]] = {}  # Built when needed.
+
+        for state, names in districts.items():
+            self._names[state] = list(names.values())
+            for key, district in names.items():
+                self._index[(state, key)] = (state, district)
+    # End of __init__().
+
+    def add(self, state: str, district: str) -> None:
+        """Add a district to the state (nothing is done if it's there)."""
+
+        key = (state, normalize(district))
+        if key in self._index:
+            return
+
+        self._index[key] = (state, district)
+        self._names.setdefault(state, []).append(district)
+        self._tuples.pop(state, None)  # Names changed, build again.
+    # End of add().
+
+    def lookup(self, state: str, name: str) -> Optional[tuple[str, str]]:
+        """Get the (state, district) of the name, if the state has it."""
+        return self._index.get((state, normalize(name)))
+    # End of lookup().
+
+    def names(self, state: str) -> tuple[str, ...]:
+        """Get the names of districts of the state, as a tuple."""
+        if (names := self._tuples.get(state)) is None:
+            names = self._tuples[state] = tuple(self._names.get(state, ()))
+        return names
+    # End of names().
+
+    def resolve(
+        self,
+        source: str,
+        state: str,
+        names: Iterable[str]
+    ) -> dict[str, str]:
+        """
+        Get the canonical names of the districts of the state, as a dict.
+
+        Exact (normalized) match is tried first, then the aliases learned for
+        the source, and then fuzzy matching for all the rest at once.
+
+        Raises UnresolvedNames (with the rest resolved) if some names aren't
+        close enough to any district.
+        """
+        resolved = {}
+        rest = []
+
+        for name in names:
+            if (entry := self.lookup(state, name)) is not None:
+                resolved[name] = entry[1]
+            else:
+                rest.append(name)
+
+        try:
+            resolved.update(resolve_names(f"{source}/{state}", rest,
+                                          self.names(state)))
+        except UnresolvedNames as e:
+            e.resolved = resolved | e.resolved
+            raise
+
+        return resolved
+    # End of resolve().
+# End of DistrictIndex.
+
+
+# End of file.
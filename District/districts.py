@@ -21,242 +21,300 @@
 
 
 # Import standard library dependencies.
-import copy
-import pickle
-from tempfile import NamedTemporaryFile
-from typing import Any
+from typing import Any, Optional
 
 # Import external dependencies.
-from dateutil.parser import parse as date_parser
+import numpy as np
 import pendulum
-import pylightxl
-import requests
 
 # Import helper functions.
-from Helpers.fuzzy_find_name import find_name
+from Helpers.fetch import get_payload
+from Helpers import json_io
+from Helpers.aliases import resolve_names
+from Helpers.fuzzy_find_name import UnresolvedNames
+from Helpers.metrics import count, span
+from Helpers.stage_cache import cached_stage
+from Helpers.stats_store import DISTRICT_RATES, StatsStore, round_pc
+from Helpers.xlsx_reader import iter_rows
 from .district_helper import district_name_fixer
+from .district_index import DistrictIndex
+from .gazetteer import load_gazetteer
+
+
+# Version of the output of read_xlsx(), for the stage cache. Bump it when the
+# reading changes, so that results of the older code aren't reused.
+XLSX_PARSER_VERSION = 2
+
+# Columns of the 3 tables in the district XLSX.
+TABLE_COLUMNS = (
+    ("C", "D", "E", "F", "G"),
+    ("J", "K", "L", "M", "N"),
+    ("Q", "R", "S", "T", "U"),
+)
+
+
+def read_xlsx(content: bytes) -> dict[str, Any]:
+    """
+    Reads the district XLSX, and returns the week and rows of the 3 tables.
+
+    There will be 3 tables, with 5 columns (+ 1 for serial number).
+    Columns: Table 1 - C to G  ;  Table 2 - J to N  ;  Table 3 - Q to U
+    Their entries (excluding heading) will start at 12th row.
+    We will continue to parse next row until we reach the "Grand Total" row.
+
+    The sheet is streamed once, reading all 3 tables side by side, till all
+    of them have ended.
+    """
+    tables = [[], [], []]
+    ended = [False, False, False]
+    next_row = 12  # Next row number expected in the tables.
+    week = ""
+
+    wanted = {"B"}.union(*TABLE_COLUMNS)
+
+    for row_number, cells in iter_rows(content, "Sheet1", wanted):
+        if row_number == 7:
+            week = cells.get("B", "")
+
+        if row_number < next_row:
+            continue
+
+        # Empty rows aren't in the XLSX, but they were part of the tables.
+        empty_rows = row_number - next_row
+        next_row = row_number + 1
+
+        for i, columns in enumerate(TABLE_COLUMNS):
+            if ended[i]:
+                continue
+
+            tables[i].extend([("",) * len(columns)] * empty_rows)
+
+            data = tuple(cells.get(column, "") for column in columns)
+
+            if data[0].strip() in ("Grand Total", "NA"):
+                ended[i] = True
+            else:
+                tables[i].append(data)
+        # End of for loop.
+
+        if all(ended):
+            break
+    # End of for loop.
+
+    return {"week": week, "tables": tables}
+# End of read_xlsx().
 
 
 def fill_district_data(pretty: dict[str, Any]) -> None:
     """Get the district data / numbers, and fill them in the `pretty` dict."""
 
-    # We have saved names of almost all districts with their respective states.
-    # Hence, we will first create their dicts in the data and then fill them.
+    # We have saved names of almost all districts with their respective states
+    # in the gazetteer. Hence, we will first add them to the stats and then
+    # fill them.
     # Note that districts of DL, LD aren't there, so create them later.
 
-    with open("./District/districts.pickle", "rb") as f:
-        state_district_map = pickle.load(f)
+    gazetteer_index = load_gazetteer()["index"]["districts"]
+    stats: StatsStore = pretty["internal"]["stats"]
 
     pretty_states_set = set(pretty.keys()) - {"All", "internal", "timestamp"}
     pretty_states_tuple = tuple(pretty_states_set)
-    state_district_map_keys = set(state_district_map.keys())
-
-    district_struct = {
-        "centers": 0,
-        "rat_pc": 0,
-        "rtpcr_pc": 0,
-        "positivity_rate": 0,
-        "iteration": 0  # To delete later
-    }
+
+    # Index of the district names, for looking up names in the sources.
+    # Districts added below are added to it too.
+    district_index = DistrictIndex({
+        state: gazetteer_index.get(pretty[state].abbr, {})
+        for state in pretty_states_set
+    })
 
     for state in pretty_states_set:
-        if (abbr := pretty[state]["abbr"]) in state_district_map_keys:
-            for district in state_district_map[abbr]:
-                if district in ("Unknown", "Other State"):
-                    continue
-                # else:
-                pretty[state]["districts"][district] = copy.deepcopy(
-                                                            district_struct)
+        for district in district_index.names(state):
+            stats.add_district(pretty[state], district)
 
     # Get number of centers in districts from JSON, and save them.
 
-    centers = requests.get(pretty["internal"]["mygov_district_centers"]).json()
+    centers = json_io.loads(get_payload(pretty, "mygov_district_centers"))
+    count("rows_parsed/mygov_district_centers", len(centers))
 
-    for data in centers:
-        if data["state_name"] in pretty_states_set:
-            state = data["state_name"]
-        else:
-            state = find_name(data["state_name"], pretty_states_tuple)
+    # Match all the state names to ours at once.
+    states = resolve_names("mygov_district_centers",
+                           (data["state_name"] for data in centers),
+                           pretty_states_tuple)
+
+    # Fix the district names, and match the ones of each state at once.
+    # Districts of DL, LD are new, they are added as they are.
 
-        state_districts_dict = pretty[state]["districts"]
-        state_district_names = state_district_map[pretty[state]["abbr"]]
+    rows = []  # (state, district, centers)
+    to_match: dict[str, list[str]] = {}
 
+    for data in centers:
+        state = states[data["state_name"]]
         district = district_name_fixer(data["district_name"], state)
+        rows.append((state, district, data["centers"]))
 
-        if state in ("Delhi", "Lakshadweep"):
-            state_districts_dict[district] = copy.deepcopy(district_struct)
-            state_district_map[pretty[state]["abbr"]].append(district)
+        if state not in ("Delhi", "Lakshadweep"):
+            to_match.setdefault(state, []).append(district)
 
-        elif district not in set(state_district_names):
-            district = find_name(district, tuple(state_district_names))
+    districts = {
+        state: district_index.resolve("mygov_district_centers", state, names)
+        for state, names in to_match.items()
+    }
+
+    for state, district, num_centers in rows:
+        if state in ("Delhi", "Lakshadweep"):
+            row = stats.add_district(pretty[state], district)
+            district_index.add(state, district)
 
-        # Now set the number of centres.
-        state_districts_dict[district]["centers"] += data["centers"]
-
-    # Now we will parse the excel file.
-
-    # The URL can be at times invalid, and changing date may work.
-    xlsx_url = pretty["internal"]["mohfw_xlsx"]
-    xlsx_date_str = xlsx_url.split("Analysis")[1].split(".")[0]
-    xlsx_date = pendulum.instance(
-        date_parser(xlsx_date_str, fuzzy=True, dayfirst=True)
-    )
-
-    if xlsx_date.format("DDMMMMYYYY") == xlsx_date_str:
-        date_format = "DDMMMMYYYY"
-    elif xlsx_date.format("DDMMMYYYY") == xlsx_date_str:
-        date_format = "DDMMMYYYY"
-    else:
-        date_format = "DDMMMYYYY"  # No case of DDMMYYYY filename yet.
-
-    for i in range(3):  # Will check 3 times -> Current, -1 day, -2 days.
-        response = requests.get(xlsx_url)
-        if response.status_code == 200:
-            break
         else:
-            new_date = xlsx_date.subtract(days=(i + 1)).format(date_format)
-            xlsx_url = xlsx_url.replace(xlsx_date_str, new_date)
-            xlsx_date_str = new_date
-    else:
-        # For loop didn't break.
-        raise ValueError("Cannot get district xlsx file (status_code != 200).")
+            row = pretty[state].districts[districts[state][district]]
 
-    file = NamedTemporaryFile(suffix=".xlsx")
-    file.write(response.content)
+        # Now set the number of centres.
+        stats.district_centers[row] += num_centers
 
-    xlsx = pylightxl.readxl(file.name)
-    sheet = xlsx.ws("Sheet1")
+    # Now we will parse the excel file (only if it has changed since last run).
 
-    file.close()
+    xlsx = cached_stage("mohfw_xlsx", get_payload(pretty, "mohfw_xlsx"),
+                        read_xlsx, XLSX_PARSER_VERSION)
+    count("rows_parsed/mohfw_xlsx", sum(len(rows) for rows in xlsx["tables"]))
 
     # Set timestamps and meta data.
 
     pretty["timestamp"]["districts"] = {
         "primary_source": "mohfw",
-        "week": sheet.address("B7"),
+        "week": xlsx["week"],
         "last_fetched_unix": round(pendulum.now().timestamp())
     }
 
-    # There will be 3 tables, with 5 columns (+ 1 for serial number).
-    # Columns: Table 1 - C to G  ;  Table 2 - J to N  ;  Table 3 - Q to U
-    # Their entries (excluding heading) will start at 12th row.
-    # We will continue to parse next row until we reach the "Grand Total" row.
-    # After end of parsing one table, we will move to another.
+    # Get the state of each row. It is there only in the first row of the
+    # merged cells, so carry it over.
 
-    table_cols = (("C", "G"), ("J", "N"), ("Q", "U"))
+    entries = []  # (state, row)
 
-    for col1, col2 in table_cols:
-        j = 12
-        state = ""  # Save it, as merged cells have the entry only in 1st cell.
-
-        while True:
-            data = sheet.range(address=f"{col1}{j}:{col2}{j}")[0]
-
-            if data[0].strip() in ("Grand Total", "NA"):
-                break
+    for rows in xlsx["tables"]:
+        state = ""
 
+        for data in rows:
             if data[0]:  # If not empty string.
                 state = data[0].title().replace("And", "and")
-                if state not in pretty_states_set:
-                    state = find_name(state, pretty_states_tuple)
-
-            state_districts_dict = pretty[state]["districts"]
-            district_names_set = set(pretty[state]["districts"].keys())
-            district_names_tuple = tuple(district_names_set)
-
-            district = district_name_fixer(data[1].title(), state).strip()
-
-            if district not in district_names_set:
-                if (new_dist := f"{district} {state}") in district_names_set:
-                    district = new_dist
-                else:
-                    try:
-                        new_dist = find_name(district, district_names_tuple)
-                    except ValueError:
-                        print(f"District \"{district}\" not found in state "
-                              f"{state}. Districts in {state} are as follows:")
-                        print(district_names_tuple)
-                        state_districts_dict[district] = copy.deepcopy(
-                                                            district_struct)
-                    else:
-                        district = new_dist
-
-            state_districts_dict[district]["rat_pc"] += data[2]
-            state_districts_dict[district]["rtpcr_pc"] += data[3]
-            state_districts_dict[district]["positivity_rate"] += data[4]
-            state_districts_dict[district]["iteration"] += 1
-
-            j += 1
-        # End of while loop.
-    # End of for loop.
+            entries.append((state, data))
+
+    # Match all the state names to ours at once.
+    states = resolve_names("mohfw_xlsx", (state for state, _ in entries),
+                           pretty_states_tuple)
+
+    # Fix the district names, and find the ones we don't have.
+    # Some districts have the state in their name, to tell them apart from
+    # districts of same name in other states.
+
+    def lookup(state: str, district: str) -> Optional[tuple[str, str]]:
+        return (district_index.lookup(state, district)
+                or district_index.lookup(state, f"{district} {state}"))
+
+    entries = [
+        (states[state],
+         district_name_fixer(data[1].title(), states[state]).strip(),
+         data)
+        for state, data in entries
+    ]
+
+    to_match = {}
+    for state, district, _ in entries:
+        if lookup(state, district) is None:
+            to_match.setdefault(state, []).append(district)
+
+    # Match the districts of each state at once.
+
+    districts = {}
+    for state, names in to_match.items():
+        try:
+            districts[state] = district_index.resolve("mohfw_xlsx", state,
+                                                      names)
+        except UnresolvedNames as e:
+            print(f"Districts {e.names} not found in state {state}. "
+                  f"Districts in {state} are as follows:")
+            print(district_index.names(state))
+
+            for district in e.names:
+                stats.add_district(pretty[state], district)
+                district_index.add(state, district)
+
+            districts[state] = e.resolved
+
+    # Now fill the data.
+
+    for state, district, data in entries:
+        if (entry := lookup(state, district)) is not None:
+            district = entry[1]
+        else:
+            district = districts[state][district]
 
-    # If we added multiple times, we need to average out the percentages.
-    for state in pretty_states_set:
-        for district in (districts := pretty[state]["districts"]):
-            dist_dict = districts[district]
+        row = pretty[state].districts[district]
+        stats.district_rates[row] += data[2:5]
+        stats.district_float[row] |= [isinstance(i, float) for i in data[2:5]]
+        stats.district_count[row] += 1
+
+    with span("aggregate/districts"):
+        aggregate_districts(pretty, stats, pretty_states_set)
+# End of fill_district_data()
 
-            # Divide if > 1 (already summed up).
-            if (num := districts[district]["iteration"]) > 1:
-                dist_dict["rat_pc"] = round((dist_dict["rat_pc"] / num), 5)
-                dist_dict["rtpcr_pc"] = round((dist_dict["rtpcr_pc"] / num), 5)
-                dist_dict["positivity_rate"] = round(
-                    (dist_dict["positivity_rate"] / num), 5
-                )
 
-            # Delete the field.
-            del dist_dict["iteration"]
+def aggregate_districts(
+    pretty: dict[str, Any],
+    stats: StatsStore,
+    pretty_states_set: set[str]
+) -> None:
+    """Average out district stats, and set state and national aggregates."""
+
+    num_districts = stats.num_districts
+    rates = stats.district_rates[:num_districts]  # View, changes are stored.
+    num = stats.district_count[:num_districts]
+
+    # If we added multiple times, we need to average out the percentages.
+    # Divide if > 1 (already summed up).
+    summed = num > 1
+    rates[summed] = round_pc(rates[summed] / num[summed, None])
+    stats.district_float[:num_districts][summed] = True
 
     # Now we will set aggregate national and state stats.
+    # Sum up the districts of each state at once.
 
-    natl_agg = copy.deepcopy(district_struct)
+    regions = stats.district_region[:num_districts]
 
-    for state in pretty_states_set:
-        state_agg = copy.deepcopy(district_struct)
+    state_centers = np.zeros(stats.num_regions, dtype=np.int64)
+    np.add.at(state_centers, regions, stats.district_centers[:num_districts])
 
-        if not pretty[state]["districts"]:
-            # No districts available to loop over. Example: Miscellaneous.
-            del state_agg["iteration"]
-            pretty[state]["districts"]["Aggregate"] = state_agg
-            continue
+    state_rates = np.zeros((stats.num_regions, len(DISTRICT_RATES)))
+    np.add.at(state_rates, regions, rates)
 
-        # Loop over all districts to set state aggregate.
-        for distr in (districts := pretty[state]["districts"]):
-            state_agg["centers"] += districts[distr]["centers"]
-            state_agg["rat_pc"] += districts[distr]["rat_pc"]
-            state_agg["rtpcr_pc"] += districts[distr]["rtpcr_pc"]
-            state_agg["positivity_rate"] += districts[distr]["positivity_rate"]
-            state_agg["iteration"] += 1
-
-        # Add to national aggregate first before proceeding.
-        natl_agg["centers"] += state_agg["centers"]
-        natl_agg["rat_pc"] += state_agg["rat_pc"]
-        natl_agg["rtpcr_pc"] += state_agg["rtpcr_pc"]
-        natl_agg["positivity_rate"] += state_agg["positivity_rate"]
-        natl_agg["iteration"] += state_agg["iteration"]
-
-        # Now set the percentage in state aggregate.
-        num = state_agg["iteration"]
-        state_agg["rat_pc"] = round((state_agg["rat_pc"] / num), 5)
-        state_agg["rtpcr_pc"] = round((state_agg["rtpcr_pc"] / num), 5)
-        state_agg["positivity_rate"] = round(
-            (state_agg["positivity_rate"] / num), 5
-        )
-
-        # Store the state aggregate.
-        del state_agg["iteration"]
-        pretty[state]["districts"]["Aggregate"] = state_agg
-    # End of for loop over the states.
-
-    # Set %ages and store national aggregate.
-
-    num = natl_agg["iteration"]
-    natl_agg["rat_pc"] = round((natl_agg["rat_pc"] / num), 5)
-    natl_agg["rtpcr_pc"] = round((natl_agg["rtpcr_pc"] / num), 5)
-    natl_agg["positivity_rate"] = round((natl_agg["positivity_rate"] / num), 5)
-
-    del natl_agg["iteration"]
-    pretty["All"]["districts"]["Aggregate"] = natl_agg
-# End of fill_district_data()
+    state_num = np.bincount(regions, minlength=stats.num_regions)
+
+    # States having districts, as only they are counted nationally.
+    # Example of one which doesn't: Miscellaneous.
+    states = [pretty[state].index for state in pretty_states_set
+              if pretty[state].districts]
+
+    natl_centers = state_centers[states].sum()
+    natl_rates = state_rates[states].sum(axis=0) / state_num[states].sum()
+
+    # Now set the percentages in state aggregates, and store them.
+    state_rates[states] /= state_num[states, None]
+
+    for state in pretty_states_set:
+        region = pretty[state]
+        has_districts = bool(region.districts)
+        row = stats.add_district(region, "Aggregate")
+
+        if has_districts:  # Else all are zeros.
+            stats.district_centers[row] = state_centers[region.index]
+            stats.district_rates[row] = round_pc(state_rates[region.index])
+            stats.district_float[row] = True
+
+    # Store national aggregate.
+
+    row = stats.add_district(pretty["All"], "Aggregate")
+    stats.district_centers[row] = natl_centers
+    stats.district_rates[row] = round_pc(natl_rates)
+    stats.district_float[row] = True
+# End of aggregate_districts()
 
 
 # End of file.
@@ -0,0 +1,133 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from functools import lru_cache
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+
+# The districts of the states (keyed by their abbreviations), and the renames
+# of district names are kept in the source, which is edited by hand. The
+# names of the states there are only for the editors, the names and Hindi
+# names in the output come from MyGov. The source is compiled to the
+# gazetteer, which also has the lookup index prebuilt. The gazetteer has the
+# hash of the source it was compiled from, so that a stale one isn't used.
+# After editing the source, compile it by running (from the repository root):
+#
+#     python -m District.gazetteer
+
+SOURCE_FILE = Path("./District/gazetteer_source.json")
+GAZETTEER_FILE = Path("./District/gazetteer.json")
+
+# Change it when the layout of the compiled file changes.
+GAZETTEER_VERSION = 2
+
+
+def normalize(name: str) -> str:
+    """Normalize a name for lookup (case and extra spaces don't matter)."""
+    return " ".join(name.casefold().split())
+# End of normalize().
+
+
+def build_gazetteer(source: bytes) -> dict[str, Any]:
+    """Compile the source JSON to the gazetteer, with the indexes."""
+
+    data = json.loads(source)
+
+    states = {}          # Abbreviation => districts.
+    district_index = {}  # Abbreviation => {normalized name => district}.
+
+    for state in data["states"]:
+        abbr = state["abbr"]
+
+        if abbr in states:
+            raise ValueError(f"State {abbr} is in the source twice.")
+
+        states[abbr] = state["districts"]
+
+        district_index[abbr] = {}
+        for district in state["districts"]:
+            if (key := normalize(district)) in district_index[abbr]:
+                raise ValueError(f"District {district} of {abbr} is in the "
+                                 f"source twice.")
+            district_index[abbr][key] = district
+
+    return {
+        "version": GAZETTEER_VERSION,
+        "source_sha256": hashlib.sha256(source).hexdigest(),
+        "states": states,
+        "district_renames": data["district_renames"],
+        "index": {
+            "districts": district_index,
+        },
+    }
+# End of build_gazetteer().
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer() -> dict[str, Any]:
+    """
+    Load the compiled gazetteer (once per run).
+
+    Don't modify the returned dict, as it is shared by all the callers.
+    """
+    gazetteer = json.loads(GAZETTEER_FILE.read_bytes())
+
+    if gazetteer.get("version") != GAZETTEER_VERSION:
+        raise ValueError(f"{GAZETTEER_FILE} is of version "
+                         f"{gazetteer.get('version')}, expected "
+                         f"{GAZETTEER_VERSION}. Compile it again by running "
+                         f"python -m District.gazetteer")
+
+    source_sha256 = hashlib.sha256(SOURCE_FILE.read_bytes()).hexdigest()
+    if gazetteer.get("source_sha256") != source_sha256:
+        raise ValueError(f"{GAZETTEER_FILE} is not compiled from the current "
+                         f"{SOURCE_FILE}. Compile it again by running "
+                         f"python -m District.gazetteer")
+
+    return gazetteer
+# End of load_gazetteer().
+
+
+def main() -> None:
+    """Compile the source to the gazetteer file."""
+
+    gazetteer = build_gazetteer(SOURCE_FILE.read_bytes())
+
+    GAZETTEER_FILE.write_text(json.dumps(gazetteer, ensure_ascii=False,
+                                         separators=(",", ":")) + "\n")
+
+    num_districts = sum(len(districts)
+                        for districts in gazetteer["states"].values())
+    print(f"Compiled {len(gazetteer['states'])} states and {num_districts} "
+          f"districts to {GAZETTEER_FILE}.")
+# End of main().
+
+
+if __name__ == "__main__":
+    main()
+
+
+# End of file.
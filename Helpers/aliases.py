@@ -0,0 +1,140 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import json
+from pathlib import Path
+import threading
+from typing import Iterable
+
+# Import helper functions.
+from Helpers.atomic_write import write_atomically
+from Helpers.fuzzy_find_name import UnresolvedNames, find_names
+from Helpers.metrics import count
+
+
+# Names resolved in earlier runs. Persisted between runs by the CI cache.
+ALIAS_FILE = Path("./.cache/aliases.json")
+
+# {source: {name as in the source: name used by us}}
+_lock = threading.Lock()
+_aliases: dict[str, dict[str, str]] = {}
+_changed = False
+
+
+def load_aliases() -> None:
+    """Load the aliases stored by the earlier runs (if any)."""
+    global _aliases, _changed
+
+    try:
+        aliases = json.loads(ALIAS_FILE.read_text())
+    except (FileNotFoundError, ValueError):
+        aliases = {}
+
+    with _lock:
+        _aliases = aliases
+        _changed = False
+# End of load_aliases().
+
+
+def save_aliases() -> None:
+    """Store the aliases for the next runs, if new ones were learned."""
+    global _changed
+
+    with _lock:
+        if not _changed:
+            return
+
+        ALIAS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(ALIAS_FILE, json.dumps(_aliases, indent=4,
+                                                sort_keys=True).encode())
+        _changed = False
+# End of save_aliases().
+
+
+def resolve_names(
+    source: str,
+    names: Iterable[str],
+    name_set: tuple[str]
+) -> dict[str, str]:
+    """
+    Get our names for the names used by a source, say "A & N Islands".
+
+    Names in the name set are used as is. If a name was resolved before for
+    the same source, the same result is used (if it's still in the name set).
+    The rest are matched at once with `find_names()`, and the results are
+    remembered. New names are printed, so that they can be reviewed in the
+    CI logs. Returns {name: our name}.
+
+    The source should tell apart the scope too, like "mohfw_xlsx/Gujarat"
+    for districts of a state.
+
+    Raises UnresolvedNames (with the rest resolved) if some names can't be
+    matched.
+    """
+    global _changed
+
+    known_names = set(name_set)
+    resolved: dict[str, str] = {}
+    unknown = []
+
+    with _lock:
+        aliases = _aliases.get(source, {})
+
+        for name in dict.fromkeys(names):  # Unique, in order.
+            if name in known_names:
+                resolved[name] = name
+            elif aliases.get(name) in known_names:
+                resolved[name] = aliases[name]
+                count("cache_hits/aliases")
+            else:
+                unknown.append(name)
+
+    if not unknown:
+        return resolved
+
+    error = None
+    try:
+        found = find_names(unknown, name_set)
+    except UnresolvedNames as e:
+        found, error = e.resolved, e
+
+    for name, match in found.items():
+        print(f"New alias in {source}: \"{name}\" => \"{match}\" (review it "
+              f"if wrong).")
+    count("aliases_learned", len(found))
+
+    with _lock:
+        _aliases.setdefault(source, {}).update(found)
+        _changed = _changed or bool(found)
+
+    resolved.update(found)
+
+    if error is not None:
+        error.resolved = resolved
+        raise error
+
+    return resolved
+# End of resolve_names().
+
+
+# End of file.
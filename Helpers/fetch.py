@@ -0,0 +1,254 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Callable
+
+# Import external dependencies.
+# Note that bs4 and dateutil are imported only when the MoHFW homepage and the
+# XLSX are fetched, as the probe may exit the run before that.
+import pendulum
+
+# Import the HTTP client, the response cache, and helper functions.
+from Helpers import http_client
+from Helpers.http_cache import cached_get
+from Helpers.metrics import span
+
+
+# Sources whose URLs are already known in pretty["internal"].
+JSON_SOURCES = (
+    "mygov_cases",
+    "mygov_vaccination",
+    "mygov_state_centers",
+    "mygov_district_centers",
+    "mohfw_cases",
+)
+
+# Sources whose URLs are to be scraped from the MoHFW homepage.
+LINKED_SOURCES = ("mohfw_vaccination", "mohfw_xlsx")
+
+# File names of the sources when replaying (same as the ones in Example/).
+REPLAY_FILENAMES = {
+    "mygov_cases": "mygov_cases.json",
+    "mygov_vaccination": "mygov_vaccination.json",
+    "mygov_state_centers": "mygov_state_centers.json",
+    "mygov_district_centers": "mygov_district_centers.json",
+    "mohfw_cases": "mohfw_cases.json",
+    "mohfw_vaccination": "mohfw_vaccination.pdf",
+    "mohfw_xlsx": "mohfw_districts.xlsx",
+}
+
+
+def get_mohfw_links(pretty: dict[str, Any]) -> dict[str, str]:
+    """
+    Parse MoHFW website and get the requisite links. Only the links found are
+    returned, see `get_link()`.
+    """
+    from bs4 import BeautifulSoup
+
+    with span("fetch/mohfw_homepage"):
+        homepage = http_client.get("https://www.mohfw.gov.in",
+                                   "mohfw_homepage")
+        homepage.raise_for_status()
+
+    soup = BeautifulSoup(homepage.text, "lxml")
+    for link_tag in soup.findAll("a"):
+
+        if "District-wise COVID-19 test positivity rates" in str(link_tag):
+            pretty["internal"]["mohfw_xlsx"] = link_tag.get("href")
+
+        elif "Vaccination State Data" in str(link_tag):
+            pretty["internal"]["mohfw_vaccination"] = link_tag.get("href")
+
+    return {key: pretty["internal"][key] for key in LINKED_SOURCES
+            if key in pretty["internal"]}
+# End of get_mohfw_links().
+
+
+def get_link(links: Future, source: str) -> str:
+    """Wait for the MoHFW links, and get the one of the source."""
+    if (link := links.result().get(source)) is None:
+        raise ValueError(f"Link of {source} not found on the MoHFW homepage.")
+    return link
+# End of get_link().
+
+
+def get_content(url: str, source: str, cached: bool = True) -> bytes:
+    """
+    Download the given URL (if changed) and return the raw bytes.
+
+    If not cached, the response cache is neither used nor updated.
+    """
+    with span(f"fetch/{source}"):
+        if cached:
+            response = cached_get(url, source)
+        else:
+            response = http_client.get(url, source)
+    if response.status_code != 200:
+        raise ValueError(f"Cannot get {source} (status_code = "
+                         f"{response.status_code}).")
+    return response.content
+# End of get_content().
+
+
+def get_xlsx_content(xlsx_url: str) -> bytes:
+    """Download the district XLSX, trying older dates if the URL is invalid."""
+    from dateutil.parser import parse as date_parser
+
+    # The URL can be at times invalid, and changing date may work.
+    xlsx_date_str = xlsx_url.split("Analysis")[1].split(".")[0]
+    xlsx_date = pendulum.instance(
+        date_parser(xlsx_date_str, fuzzy=True, dayfirst=True)
+    )
+
+    if xlsx_date.format("DDMMMMYYYY") == xlsx_date_str:
+        date_format = "DDMMMMYYYY"
+    elif xlsx_date.format("DDMMMYYYY") == xlsx_date_str:
+        date_format = "DDMMMYYYY"
+    else:
+        date_format = "DDMMMYYYY"  # No case of DDMMYYYY filename yet.
+
+    for i in range(3):  # Will check 3 times -> Current, -1 day, -2 days.
+        with span("fetch/mohfw_xlsx"):
+            response = cached_get(xlsx_url, "mohfw_xlsx")
+        if response.status_code == 200:
+            return response.content
+        # else:
+        new_date = xlsx_date.subtract(days=(i + 1)).format(date_format)
+        xlsx_url = xlsx_url.replace(xlsx_date_str, new_date)
+        xlsx_date_str = new_date
+
+    # For loop didn't return.
+    raise ValueError("Cannot get district xlsx file (status_code != 200).")
+# End of get_xlsx_content().
+
+
+def get_replay_content(replay_root: str, source: str) -> bytes:
+    """
+    Get the recorded payload of the source, instead of the live one.
+
+    The root can be a local directory, or the URL of a local HTTP server
+    serving such a directory. For example, `python3 -m http.server`. The
+    response cache isn't used, as it's for the live sources.
+    """
+    filename = REPLAY_FILENAMES[source]
+
+    if replay_root.startswith(("http://", "https://")):
+        return get_content(f"{replay_root.rstrip('/')}/{filename}", source,
+                           cached=False)
+    # else:
+    with span(f"fetch/{source}"):
+        return (Path(replay_root) / filename).read_bytes()
+# End of get_replay_content().
+
+
+def fetch_sources(pretty: dict[str, Any]) -> None:
+    """
+    Starts downloading every source at once, before any parsing is done.
+
+    Futures are stored in pretty["internal"]["payloads"], keyed by the source
+    name, and the parsers get the raw bytes via `get_payload()`. Sources which
+    are already there (say, from the probe) are not fetched again. The PDF and
+    XLSX links are known only after scraping the MoHFW homepage, so those
+    downloads are chained after it, while the JSON downloads proceed.
+
+    If pretty["internal"]["replay_root"] is set, the recorded payloads from
+    there are used instead (see `get_replay_content()`).
+
+    The PDF is needed only if MoHFW vaccination data is used, which is known
+    after the cases are filled. So it's downloaded only when asked for by
+    `get_payload()`, instead of holding up the runs which don't need it.
+
+    Thus, the total time taken is roughly that of the slowest source.
+    """
+
+    # One worker per download, as the linked downloads wait on the homepage.
+    executor = ThreadPoolExecutor(
+        max_workers=len(JSON_SOURCES) + len(LINKED_SOURCES) + 1,
+        thread_name_prefix="fetch"
+    )
+    payloads: dict[str, Future] = pretty["internal"].get("payloads", {})
+    pretty["internal"]["payloads"] = payloads
+
+    # Sources to be downloaded when asked for, {source: download function}.
+    deferred: dict[str, Callable[[], bytes]] = {}
+    pretty["internal"]["deferred_payloads"] = deferred
+
+    # If replaying, all sources are available directly.
+    if (replay_root := pretty["internal"].get("replay_root")) is not None:
+        for source in JSON_SOURCES + LINKED_SOURCES:
+            payloads[source] = executor.submit(get_replay_content,
+                                               replay_root, source)
+        executor.shutdown(wait=False)
+        return
+
+    for source in JSON_SOURCES:
+        if source in payloads:
+            continue
+        payloads[source] = executor.submit(get_content,
+                                           pretty["internal"][source], source)
+
+    links = executor.submit(get_mohfw_links, pretty)
+
+    deferred["mohfw_vaccination"] = lambda: get_content(
+        get_link(links, "mohfw_vaccination"), "mohfw_vaccination"
+    )
+    payloads["mohfw_xlsx"] = executor.submit(
+        lambda: get_xlsx_content(get_link(links, "mohfw_xlsx"))
+    )
+
+    # Don't block here, threads will finish on their own.
+    executor.shutdown(wait=False)
+# End of fetch_sources().
+
+
+def get_payload(pretty: dict[str, Any], source: str) -> bytes:
+    """
+    Wait for the given source to be downloaded, and return its bytes.
+    Raises DeadlineExceeded if the deadline is over before that.
+
+    Deferred sources (see `fetch_sources()`) start downloading now.
+    """
+    payloads = pretty["internal"]["payloads"]
+
+    deferred = pretty["internal"].get("deferred_payloads", {})
+    if (download := deferred.pop(source, None)) is not None:
+        executor = ThreadPoolExecutor(max_workers=1,
+                                      thread_name_prefix="fetch")
+        payloads[source] = executor.submit(download)
+        executor.shutdown(wait=False)
+
+    future = payloads[source]
+    with span(f"wait/{source}"):  # Time for which parsing was blocked.
+        try:
+            return future.result(timeout=http_client.remaining_time())
+        except FutureTimeoutError:
+            raise http_client.DeadlineExceeded(
+                f"Run deadline exceeded while waiting for {source}."
+            ) from None
+# End of get_payload().
+
+
+# End of file.
@@ -22,38 +22,102 @@
 
 # Import standard library dependencies.
 from functools import lru_cache
+from typing import Iterable
 
 # Import external dependencies.
-from thefuzz import process as thefuzz_process
+from rapidfuzz import fuzz, process, utils
+
+# Import helper functions.
+from Helpers.metrics import count, span
+
+
+# Different spellings for आ, ई, ऊ.
+VOWELS = {"aa": "a", "ee": "i", "oo": "u", "y": "i"}
+
+
+class UnresolvedNames(ValueError):
+    """Raised when some names can't be matched. Has the ones matched too."""
+
+    def __init__(self, names: list[str], resolved: dict[str, str]) -> None:
+        super().__init__("Cannot find entries for "
+                         + ", ".join(f"'{name}'" for name in names) + ".")
+        self.names = names  # The names which couldn't be matched.
+        self.resolved = resolved  # {name: match} for the rest.
+    # End of __init__().
+# End of UnresolvedNames.
+
+
+def simplify_vowels(name: str) -> str:
+    """Use same spelling for आ, ई, ऊ (say, "Aadilaabaad" => "Adilabad")."""
+    for vowel, replacement in VOWELS.items():
+        name = name.replace(vowel, replacement)
+    return name
+# End of simplify_vowels().
 
 
 @lru_cache(maxsize=None)
-def find_name(name: str, name_set: tuple[str]) -> str:
+def get_choices(name_set: tuple[str]) -> tuple[list[str], list[str]]:
+    """Processed names of the set, as is and with simplified vowels."""
+    processed = [utils.default_process(name) for name in name_set]
+    return processed, [simplify_vowels(name) for name in processed]
+# End of get_choices().
+
+
+def find_names(names: Iterable[str], name_set: tuple[str]) -> dict[str, str]:
     """
-    Given a name, find the state/district having the closest spelling.
+    Find the closest names in the set for all the names at once.
 
     Using fuzzy matching, as there can be typos, or some names can be split or
     written in different ways. Examples are:
         - "A & N Islands" for "Andaman and Nicobar Islands",
         - "Telengana" instead of "Telangana",
         - Separate "Daman & Diu" and "Dadra & Nagar Haveli" instead of merged.
+
+    All the names are scored against the set in one go. Names still not
+    matched are then tried with simplified vowels on both sides (precomputed
+    for the set), for different spellings of आ, ई, ऊ. Returns
+    {name: closest name}.
+
+    Raises UnresolvedNames listing all the names which couldn't be matched.
     """
+    pending = list(dict.fromkeys(names))  # Unique, in order.
+    resolved: dict[str, str] = {}
+
+    if not pending:
+        return resolved
+
+    count("fuzzy_match_fallbacks", len(pending))
+
+    with span("name_resolution"):
+        processed, simplified = get_choices(name_set)
+
+        for choices, variant in ((processed, None),
+                                 (simplified, simplify_vowels)):
+            if not pending or not choices:
+                break
+
+            queries = [utils.default_process(name) for name in pending]
+            if variant is not None:
+                queries = [variant(query) for query in queries]
 
-    entry = thefuzz_process.extractOne(name, name_set, score_cutoff=50,
-                                       processor=lambda x: x)
+            # Scores below the cutoff are 0.
+            scores = process.cdist(queries, choices, scorer=fuzz.WRatio,
+                                   score_cutoff=50)
+            best = scores.argmax(axis=1)
 
-    if entry is not None:
-        return entry[0]
+            unmatched = []
+            for name, row, i in zip(pending, scores, best):
+                if row[i] > 0:
+                    resolved[name] = name_set[i]
+                else:
+                    unmatched.append(name)
+            pending = unmatched
 
-    # else: Account for different spellings for आ, ई, ऊ.
-    vowels = {"aa": "a", "ee": "i", "oo": "u", "y": "i"}
+    if pending:
+        raise UnresolvedNames(pending, resolved)
 
-    for vowel in vowels.keys():
-        if vowel in name:
-            return find_name(name.replace(vowel, vowels[vowel]), name_set)
-    else:
-        raise ValueError(f"Cannot find entry for '{name}'.")
-# End of find_name()
+    return resolved
+# End of find_names().
 
 
 # End of file.
@@ -0,0 +1,95 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import hashlib
+import json
+from pathlib import Path
+from typing import NamedTuple
+
+# Import the HTTP client and helper functions.
+from Helpers import http_client
+from Helpers.atomic_write import write_atomically
+from Helpers.metrics import count
+
+
+# Where the responses are stored. Persisted between runs by the CI cache.
+CACHE_DIR = Path("./.cache/http")
+
+
+class CachedResponse(NamedTuple):
+    """Status code and body of a (possibly cached) response."""
+    status_code: int
+    content: bytes
+    from_cache: bool  # True if server said 304 and we used the stored body.
+# End of CachedResponse.
+
+
+def cached_get(url: str, source: str) -> CachedResponse:
+    """
+    GET the URL, using the validators of the stored response (if any).
+
+    `If-None-Match` and `If-Modified-Since` are sent if we have the ETag or
+    Last-Modified of the earlier response. On a 304, the stored body is
+    returned. On a 200, the body and its validators are stored for next time.
+    """
+    key = hashlib.sha256(url.encode()).hexdigest()[:32]
+    meta_path = CACHE_DIR / f"{key}.json"
+    body_path = CACHE_DIR / f"{key}.body"
+
+    headers = {}
+
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (FileNotFoundError, ValueError):
+        meta = {}
+
+    if meta.get("url") == url and body_path.exists():
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = http_client.get(url, source, headers=headers)
+
+    if response.status_code == 304 and headers:
+        count(f"cache_hits/http/{source}")
+        return CachedResponse(200, body_path.read_bytes(), True)
+
+    if response.status_code == 200:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        if etag or last_modified:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            write_atomically(body_path, response.content)
+            write_atomically(meta_path, json.dumps({
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified
+            }).encode())
+
+    return CachedResponse(response.status_code, response.content, False)
+# End of cached_get().
+
+
+# End of file.
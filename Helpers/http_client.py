@@ -0,0 +1,166 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import random
+import time
+from typing import Any, Optional
+
+# Import external dependencies.
+import requests
+from requests.adapters import HTTPAdapter
+
+# Import helper functions.
+from Helpers.metrics import count
+
+
+class DeadlineExceeded(RuntimeError):
+    """Raised when the run has gone past its deadline."""
+    pass
+# End of DeadlineExceeded.
+
+
+# (Connect, Read) timeouts in seconds for each source.
+TIMEOUTS = {
+    "default": (10, 30),
+
+    "mohfw_homepage": (10, 30),
+    "mohfw_cases": (10, 30),
+    "mohfw_vaccination": (10, 90),  # PDF, can be slow.
+    "mohfw_xlsx": (10, 90),         # XLSX, can be slow.
+
+    "mygov_cases": (10, 30),
+    "mygov_vaccination": (10, 30),
+    "mygov_state_centers": (10, 30),
+    "mygov_district_centers": (10, 60),
+}
+
+# Retry policy. Sleep is random between 0 and BACKOFF * 2^attempt (jitter).
+RETRIES = 3
+BACKOFF = 2.0  # In seconds.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Bodies are read in chunks of this size, so that the deadline is checked
+# while downloading.
+CHUNK_SIZE = 16 * 1024
+
+# Default deadline of the whole run, in seconds. Change with set_deadline().
+DEFAULT_DEADLINE = 15 * 60
+
+
+# Only one session, so that connections to the same host are kept alive and
+# reused. Pool is big enough for all the concurrent downloads to a host.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
+_deadline = time.monotonic() + DEFAULT_DEADLINE
+
+
+def set_deadline(seconds: float) -> None:
+    """Set the deadline of the run to the given seconds from now."""
+    global _deadline
+    _deadline = time.monotonic() + seconds
+# End of set_deadline().
+
+
+def remaining_time() -> float:
+    """Seconds left before the deadline. Raises if the deadline is over."""
+    if (remaining := _deadline - time.monotonic()) <= 0:
+        raise DeadlineExceeded("Run deadline exceeded, stopping.")
+    return remaining
+# End of remaining_time().
+
+
+def _read_body(response: requests.Response, read_timeout: float) -> None:
+    """
+    Read the body of the streamed response, capping the timeout of each read
+    by the time left before the deadline, so that no download outlives it.
+    Raises DeadlineExceeded if the deadline is over before the body is read.
+    """
+    chunks = []
+
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+
+            # Cap the next reads.
+            remaining = remaining_time()
+            if (sock := getattr(response.raw.connection, "sock", None)):
+                sock.settimeout(min(read_timeout, remaining))
+    finally:
+        response.close()
+
+    # Same as what requests does when the body isn't streamed.
+    response._content = b"".join(chunks)
+# End of _read_body().
+
+
+def get(url: str, source: str = "default", **kwargs: Any) -> requests.Response:
+    """
+    GET the URL using the shared session, retrying on failures.
+
+    Timeouts are taken as per the source, and are capped by the time left
+    before the deadline (for each read of the body too). Connection errors,
+    timeouts, truncated bodies, and the statuses in RETRY_STATUSES are
+    retried with jittered exponential backoff.
+
+    The last response is returned even if its status is bad, so that callers
+    can decide what to do (see `get_xlsx_content()` for example).
+    """
+    connect_timeout, read_timeout = TIMEOUTS.get(source, TIMEOUTS["default"])
+
+    response: Optional[requests.Response] = None
+
+    for attempt in range(RETRIES + 1):
+        remaining = remaining_time()
+
+        try:
+            response = _session.get(
+                url,
+                timeout=(min(connect_timeout, remaining),
+                         min(read_timeout, remaining)),
+                stream=True,
+                **kwargs
+            )
+            _read_body(response, read_timeout)
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == RETRIES:
+                raise
+            print(f"Retrying {source} due to error: {e}")
+        else:
+            count(f"bytes_downloaded/{source}", len(response.content))
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            print(f"Retrying {source} due to status {response.status_code}.")
+
+        if attempt < RETRIES:
+            time.sleep(min(random.uniform(0, BACKOFF * 2**attempt),
+                           remaining_time()))
+
+    # All retries exhausted with a bad status.
+    return response
+# End of get().
+
+
+# End of file.
@@ -0,0 +1,60 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from typing import Iterable
+
+# Import external dependencies.
+import numpy as np
+
+
+# Stripped from both ends of a cell. Counts of the last 24 hours are in
+# parentheses, like "(12,345)", and missing counts are dashes.
+STRIP_CHARS = " \t\r\n()-–—"
+
+
+def parse_counts(cells: Iterable[str]) -> np.ndarray:
+    """
+    Convert the cells of a column to integers, all at once.
+
+    Numbers are grouped the Indian way, in lakhs and crores (1,23,45,678),
+    but the commas are just dropped, so any grouping works. Blank cells and
+    dashes are 0. No locale is needed.
+
+    Raises ValueError if a cell isn't a number.
+    """
+    cells = np.asarray(list(cells), dtype=str)
+    if not cells.size:
+        return np.zeros(0, dtype=np.int64)
+
+    cells = np.char.replace(np.char.strip(cells, STRIP_CHARS), ",", "")
+
+    cells[cells == ""] = "0"
+
+    if not (valid := np.char.isdecimal(cells)).all():
+        raise ValueError(f"Not numbers: {cells[~valid].tolist()}")
+
+    return cells.astype(np.int64)
+# End of parse_counts().
+
+
+# End of file.
@@ -0,0 +1,95 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import json
+from pathlib import Path
+from typing import Any, Union
+
+# Import external dependencies.
+import orjson
+
+
+# Size of the buffer for writing the indented JSON.
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON straight from the bytes (say, a payload)."""
+    return orjson.loads(data)
+# End of loads().
+
+
+def load(path: Path) -> Any:
+    """Decode a JSON file. Raises FileNotFoundError if it's not there."""
+    return orjson.loads(path.read_bytes())
+# End of load().
+
+
+def compact_path(path: Path) -> Path:
+    """Path of the minified variant of a file, like "dashboard.min.json"."""
+    return path.with_suffix(".min.json")
+# End of compact_path().
+
+
+def dump(obj: Any, path: Path) -> None:
+    """
+    Write the object as JSON indented with 4 spaces (as we have always
+    published it), streaming it to the file instead of making a string first.
+    """
+    with open(path, "w", buffering=WRITE_BUFFER_SIZE) as f:
+        json.dump(obj, f, indent=4)
+# End of dump().
+
+
+def dump_compact(obj: Any, path: Path) -> None:
+    """Write the object as minified JSON (UTF-8, no spaces)."""
+    path.write_bytes(orjson.dumps(obj))
+# End of dump_compact().
+
+
+def dump_compact_if_changed(obj: Any, path: Path) -> bool:
+    """
+    Write the object as minified JSON, only if the file doesn't have the same
+    content already. Returns True if the file was written.
+    """
+    content = orjson.dumps(obj)
+
+    try:
+        if path.read_bytes() == content:
+            return False
+    except FileNotFoundError:
+        pass
+
+    path.write_bytes(content)
+    return True
+# End of dump_compact_if_changed().
+
+
+def dump_both(obj: Any, path: Path) -> None:
+    """Write the indented JSON at the path, and the minified one next to it."""
+    dump(obj, path)
+    dump_compact(obj, compact_path(path))
+# End of dump_both().
+
+
+# End of file.
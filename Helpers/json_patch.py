@@ -0,0 +1,70 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from typing import Any
+
+
+def pointer(path: list[str]) -> str:
+    """Make the JSON Pointer (RFC 6901) of the keys, like "/Kerala/abbr"."""
+    return "".join(
+        "/" + key.replace("~", "~0").replace("/", "~1") for key in path
+    )
+# End of pointer().
+
+
+def make_patch(old: Any, new: Any) -> list[dict[str, Any]]:
+    """
+    Make the JSON Patch (RFC 6902) which turns `old` into `new`.
+
+    Objects are compared key by key, so only the changed values are in the
+    patch. Anything else (like lists) is replaced as a whole if not equal.
+    """
+    patch = []
+
+    # Helper function.
+    def diff(old: Any, new: Any, path: list[str]) -> None:
+        if isinstance(old, dict) and isinstance(new, dict):
+            for key in old:
+                if key not in new:
+                    patch.append({"op": "remove",
+                                  "path": pointer(path + [key])})
+
+            for key, value in new.items():
+                if key not in old:
+                    patch.append({"op": "add", "path": pointer(path + [key]),
+                                  "value": value})
+                else:
+                    diff(old[key], value, path + [key])
+
+        # type() is compared too, as 1 == 1.0 and 1 == True in Python.
+        elif old != new or type(old) is not type(new):
+            patch.append({"op": "replace", "path": pointer(path),
+                          "value": new})
+    # End of diff().
+
+    diff(old, new, [])
+    return patch
+# End of make_patch().
+
+
+# End of file.
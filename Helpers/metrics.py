@@ -0,0 +1,117 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from contextlib import contextmanager
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+
+# Timing spans and counters of the current run. Stages run in different
+# threads (see Helpers/fetch.py), so updates are done with the lock held.
+_lock = threading.Lock()
+_spans: dict[str, dict[str, float]] = {}
+_counters: dict[str, int] = {}
+_started: Optional[float] = None  # Set by start_run().
+
+
+def start_run() -> None:
+    """Start the metrics of a run, discarding the ones of earlier runs."""
+    global _started
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _started = time.time()
+# End of start_run().
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time the code in the `with` block, and add it to the span of given name.
+
+    Names are like "fetch/mygov_cases" or "parse/mohfw_xlsx". If a span is
+    entered multiple times, the times are summed and the calls are counted.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with _lock:
+            stats = _spans.setdefault(name, {"wall_ms": 0.0, "calls": 0})
+            stats["wall_ms"] += elapsed_ms
+            stats["calls"] += 1
+# End of span().
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add the value to the counter of given name (say, "bytes/mohfw_xlsx")."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+# End of count().
+
+
+def get_metrics() -> dict[str, Any]:
+    """Get all the metrics of this run, rounding off the times."""
+    if _started is None:
+        raise RuntimeError("Metrics of the run weren't started, call "
+                           "start_run() first.")
+
+    with _lock:
+        return {
+            "started_unix": round(_started),
+            "duration_ms": round((time.time() - _started) * 1000, 3),
+            "spans": {
+                name: {"wall_ms": round(stats["wall_ms"], 3),
+                       "calls": stats["calls"]}
+                for name, stats in sorted(_spans.items())
+            },
+            "counters": dict(sorted(_counters.items())),
+        }
+# End of get_metrics().
+
+
+def write_metrics(metrics_dir: Path, status: str) -> Path:
+    """
+    Write the metrics of this run in the given folder.
+
+    One file per run, named by the time the run started, so that trends can
+    be tracked across the runs. The folder shouldn't be in the output root,
+    else every run would publish a file.
+    """
+    metrics = {"status": status, **get_metrics()}
+
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+
+    path = metrics_dir / time.strftime("%Y_%m_%d_%H_%M_%S.json",
+                                       time.localtime(_started))
+    path.write_text(json.dumps(metrics, indent=4))
+
+    return path
+# End of write_metrics().
+
+
+# End of file.
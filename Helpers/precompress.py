@@ -0,0 +1,104 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import gzip
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable
+
+# Import external dependencies.
+import brotli
+
+# Import helper functions.
+from Helpers.atomic_write import write_atomically
+from Helpers.metrics import count
+
+
+# SHA-256 hashes of the files compressed in the last run, keyed by the path.
+# Persisted between runs by the CI cache.
+DIGEST_FILE = Path("./.cache/compressed.json")
+
+# Highest levels, as the files are compressed once and served many times.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Extensions of the compressed files, added to the name of the file.
+SUFFIXES = (".gz", ".br")
+
+
+def compressed_paths(path: Path) -> list[Path]:
+    """Paths of the compressed files, like "dashboard.json.gz"."""
+    return [path.with_name(path.name + suffix) for suffix in SUFFIXES]
+# End of compressed_paths().
+
+
+def precompress(paths: Iterable[Path]) -> None:
+    """
+    Write gzip and brotli compressed files next to the files, so that static
+    hosts and CDNs can serve them as they are.
+
+    A file is compressed only if it has changed since it was compressed last
+    (or the compressed files are missing). gzip files have no timestamp in
+    them, so that same content gives the same bytes.
+    """
+    try:
+        digests = json.loads(DIGEST_FILE.read_text())
+    except (FileNotFoundError, ValueError):
+        digests = {}
+
+    new_digests = {}  # Of the files of this run only.
+
+    for path in paths:
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        gz_path, br_path = compressed_paths(path)
+
+        new_digests[str(path)] = digest
+
+        if (
+            digests.get(str(path)) == digest
+            and gz_path.exists() and br_path.exists()
+        ):
+            count("cache_hits/precompress")
+            continue
+
+        gz = gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+        br = brotli.compress(content, quality=BROTLI_QUALITY)
+
+        gz_path.write_bytes(gz)
+        br_path.write_bytes(br)
+
+        count("bytes/precompress/raw", len(content))
+        count("bytes/precompress/gz", len(gz))
+        count("bytes/precompress/br", len(br))
+    # End of for loop.
+
+    if new_digests != digests:
+        DIGEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(DIGEST_FILE, json.dumps(new_digests, indent=4,
+                                                 sort_keys=True).encode())
+# End of precompress().
+
+
+# End of file.
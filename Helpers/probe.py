@@ -0,0 +1,89 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from concurrent.futures import Future
+import json
+from pathlib import Path
+from typing import Any
+
+# Import the response cache.
+from Helpers.atomic_write import write_atomically
+from Helpers.http_cache import cached_get
+from Helpers import json_io
+from Helpers.metrics import span
+
+
+# Fingerprint of the upstream data used in the last successful run.
+PROBE_FILE = Path("./.cache/probe.json")
+
+
+def probe_upstream(pretty: dict[str, Any]) -> bool:
+    """
+    Cheaply checks if there is anything new upstream since the last run.
+
+    Only the small cases JSONs are fetched (mostly as 304s due to the cache),
+    and MyGov's `updated_on` and A&N total, along with MoHFW's A&N total (as
+    we fall back to MoHFW till MyGov publishes), are compared with the ones
+    used in the last successful run.
+
+    The fetched payloads are kept in pretty["internal"]["payloads"], so that
+    the fetch stage doesn't download them again. Returns True if fresh.
+    """
+    payloads = pretty["internal"].setdefault("payloads", {})
+
+    for source in ("mygov_cases", "mohfw_cases"):
+        with span(f"fetch/{source}"):
+            response = cached_get(pretty["internal"][source], source)
+        if response.status_code != 200:
+            # Let the main pipeline deal with it.
+            return True
+
+        payloads[source] = Future()
+        payloads[source].set_result(response.content)
+
+    mygov = json_io.loads(payloads["mygov_cases"].result())
+    mohfw = json_io.loads(payloads["mohfw_cases"].result())
+
+    # 0th is A&N Islands, whose totals are used for comparing data sources.
+    fingerprint = {
+        "mygov_updated_on": mygov["updated_on"],
+        "mygov_an_total": int(mygov["Total Confirmed cases"]["0"]),
+        "mohfw_an_total": int(mohfw[0]["new_positive"]),
+    }
+    pretty["internal"]["fingerprint"] = fingerprint
+
+    try:
+        return json.loads(PROBE_FILE.read_text()) != fingerprint
+    except (FileNotFoundError, ValueError):
+        return True
+# End of probe_upstream().
+
+
+def save_fingerprint(fingerprint: dict[str, Any]) -> None:
+    """Store the fingerprint of data used in this run, for the next probe."""
+    PROBE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_atomically(PROBE_FILE, json.dumps(fingerprint).encode())
+# End of save_fingerprint().
+
+
+# End of file.
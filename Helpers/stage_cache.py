@@ -0,0 +1,82 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Callable
+
+# Import helper functions.
+from Helpers.atomic_write import write_atomically
+from Helpers.metrics import count, span
+
+# Where the parsed results are stored. Persisted between runs by the CI cache.
+CACHE_DIR = Path("./.cache/stages")
+
+
+def cached_stage(
+    stage: str,  # Name of the stage, used as the file name.
+    payload: bytes,  # Raw bytes of the source parsed by the stage.
+    parse: Callable[[bytes], Any],  # Parser, returning JSON-able result.
+    version: int  # Version of the parser, bumped when its output changes.
+) -> Any:
+    """
+    Returns the parsed result of the payload, parsing only if it has changed.
+
+    The SHA-256 hash of the payload and the version of the parser are stored
+    along with the parsed result. If the payload is byte-identical to the one
+    parsed earlier by the same version of the parser, the stored result is
+    returned instead of parsing again.
+
+    Note that tuples in the result will be lists when loaded from the cache.
+    """
+    digest = hashlib.sha256(payload).hexdigest()
+    path = CACHE_DIR / f"{stage}.json"
+
+    try:
+        cached = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        pass
+    else:
+        if (
+            isinstance(cached, dict)
+            and cached.get("sha256") == digest
+            and cached.get("version") == version
+            and "result" in cached
+        ):
+            print(f"Payload of {stage} unchanged, using parsed result.")
+            count(f"cache_hits/stage/{stage}")
+            return cached["result"]
+
+    with span(f"extract/{stage}"):
+        result = parse(payload)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    write_atomically(path, json.dumps({"sha256": digest, "version": version,
+                                       "result": result}).encode())
+
+    return result
+# End of cached_stage().
+
+
+# End of file.
@@ -0,0 +1,350 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from typing import Any, Iterable, Union
+
+# Import external dependencies.
+import numpy as np
+
+
+# The stats of all regions (national, states and Miscellaneous) are kept in
+# arrays, with a row per region. The nested dicts of the output are made only
+# when writing, as follows (for a region):
+#
+#   "confirmed": {"current", "previous", "delta"}
+#   "active":    {"current", "previous", "delta", "ratio_pc"}
+#   "recovered": {"current", "previous", "delta", "ratio_pc"}
+#   "deaths":    {"current", "previous", "delta", "reconciled", "ratio_pc"}
+#
+#   "vaccination": {
+#       "centers",
+#       <age group>: {<dose>: {"total", "new"}}  (for all ages and doses)
+#   }
+#
+#   "districts": {<district>: {"centers", "rat_pc", "rtpcr_pc",
+#                              "positivity_rate"}}
+#
+# "current" is as on yesterday, "previous" is as on the day before it, and
+# "delta" is the change. "new" doses are of the last 24 hours.
+
+# Names of the axes, in the order of the indexes below.
+CASE_METRICS = ("confirmed", "active", "recovered", "deaths")
+CASE_FIELDS = ("current", "previous", "delta")
+AGE_GROUPS = ("all_ages", "18+", "15-18", "12-14")
+DOSES = ("all_doses", "1st_dose", "2nd_dose", "3rd_dose")
+DOSE_FIELDS = ("total", "new")
+DISTRICT_RATES = ("rat_pc", "rtpcr_pc", "positivity_rate")
+
+# Indexes of the axes.
+CONFIRMED, ACTIVE, RECOVERED, DEATHS = range(4)
+CURRENT, PREVIOUS, DELTA = range(3)
+ALL_AGES, AGE_18, AGE_15, AGE_12 = range(4)
+ALL_DOSES, DOSE_1, DOSE_2, DOSE_3 = range(4)
+TOTAL, NEW = range(2)
+RAT, RTPCR, POSITIVITY = range(3)
+
+# Initial number of rows, they are doubled when full.
+REGION_CAPACITY = 64
+DISTRICT_CAPACITY = 1024
+
+
+class Region:
+    """
+    General information of a region, and the rows of its stats.
+
+    Districts map the district names to their rows in the district arrays,
+    in the order they were added.
+    """
+
+    __slots__ = ("index", "abbr", "hindi", "helpline", "donate", "districts")
+
+    def __init__(
+        self,
+        index: int,  # Row of the region in the arrays.
+        abbr: str,  # State code (2 letter abbreviation).
+        hindi: str,  # Name of state in Hindi. Useful for l10n.
+        helpline: str,  # State helpline for COVID.
+        donate: str  # For donating to state funds.
+    ) -> None:
+        self.index = index
+        self.abbr = abbr
+        self.hindi = hindi
+        self.helpline = helpline
+        self.donate = donate
+        self.districts: dict[str, int] = {}
+    # End of __init__().
+# End of Region.
+
+
+def _grow(array: np.ndarray, rows: int) -> np.ndarray:
+    """Get a copy of the array with given number of rows (rest are zeros)."""
+    grown = np.zeros((rows,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+# End of _grow().
+
+
+def round_pc(values: np.ndarray) -> np.ndarray:
+    """
+    Round off the values to 5 decimal places, as round() does. np.round()
+    scales the values before rounding, which can be off in the last digit.
+    """
+    return np.array([round(value, 5) for value in values.ravel().tolist()],
+                    dtype=values.dtype).reshape(values.shape)
+# End of round_pc().
+
+
+def region_file_names(abbrs: Iterable[tuple[str, str]]) -> dict[str, str]:
+    """
+    Get the names of the files of the regions from their (name, abbreviation)
+    pairs, like {"Kerala": "KL.json"}. Files of a region (shards, time series)
+    are named so.
+
+    Raises ValueError if two regions have the same abbreviation, as their
+    files would overwrite each other.
+    """
+    names = {}
+
+    for region, abbr in abbrs:
+        name = f"{abbr}.json"
+        if name in names.values():
+            raise ValueError(f"Abbreviation {abbr} of {region} is used by "
+                             f"another region, its files can't be written.")
+        names[region] = name
+
+    return names
+# End of region_file_names().
+
+
+class StatsStore:
+    """
+    Stats of all the regions and districts of a run, held in arrays.
+
+    Arrays are replaced by bigger ones when regions or districts are added,
+    so don't keep references to them across the additions.
+    """
+
+    __slots__ = ("num_regions", "cases", "ratio_pc", "reconciled", "centers",
+                 "vaccination", "num_districts", "district_centers",
+                 "district_rates", "district_float", "district_count",
+                 "district_region")
+
+    def __init__(self) -> None:
+        self.num_regions = 0
+
+        # (region, case metric, case field)
+        self.cases = np.zeros((REGION_CAPACITY, len(CASE_METRICS),
+                               len(CASE_FIELDS)), dtype=np.int64)
+
+        # (region, case metric), percentage of confirmed. Not used for the
+        # confirmed cases (obviously).
+        self.ratio_pc = np.zeros((REGION_CAPACITY, len(CASE_METRICS)))
+
+        # Reconciled deaths, and number of vaccination centers.
+        self.reconciled = np.zeros(REGION_CAPACITY, dtype=np.int64)
+        self.centers = np.zeros(REGION_CAPACITY, dtype=np.int64)
+
+        # (region, age group, dose, dose field)
+        self.vaccination = np.zeros((REGION_CAPACITY, len(AGE_GROUPS),
+                                     len(DOSES), len(DOSE_FIELDS)),
+                                    dtype=np.int64)
+
+        self.num_districts = 0
+
+        # Number of vaccination centers, and the rates (district, rate) from
+        # the district XLSX. Districts listed multiple times are summed up
+        # and counted, to average out later.
+        self.district_centers = np.zeros(DISTRICT_CAPACITY, dtype=np.int64)
+        self.district_rates = np.zeros((DISTRICT_CAPACITY,
+                                        len(DISTRICT_RATES)))
+        self.district_count = np.zeros(DISTRICT_CAPACITY, dtype=np.int64)
+
+        # (district, rate), whether the rate is written as float. The XLSX
+        # has whole numbers as ints, and averages are floats, so they are
+        # written as they were before the store.
+        self.district_float = np.zeros((DISTRICT_CAPACITY,
+                                        len(DISTRICT_RATES)), dtype=bool)
+
+        # Row of the region of the district.
+        self.district_region = np.zeros(DISTRICT_CAPACITY, dtype=np.intp)
+    # End of __init__().
+
+    def add_region(
+        self,
+        abbr: str,
+        hindi: str,
+        helpline: str,
+        donate: str
+    ) -> Region:
+        """Add a region with all stats as 0, and get its record."""
+
+        if self.num_regions == len(self.cases):
+            rows = 2 * len(self.cases)
+            self.cases = _grow(self.cases, rows)
+            self.ratio_pc = _grow(self.ratio_pc, rows)
+            self.reconciled = _grow(self.reconciled, rows)
+            self.centers = _grow(self.centers, rows)
+            self.vaccination = _grow(self.vaccination, rows)
+
+        region = Region(self.num_regions, abbr, hindi, helpline, donate)
+        self.num_regions += 1
+
+        return region
+    # End of add_region().
+
+    def add_district(self, region: Region, district: str) -> int:
+        """
+        Add a district to the region with all stats as 0, and get its row.
+
+        If the region already has it, its stats are set to 0 again.
+        """
+
+        if (row := region.districts.get(district)) is not None:
+            self.district_centers[row] = 0
+            self.district_rates[row] = 0
+            self.district_float[row] = False
+            self.district_count[row] = 0
+            return row
+
+        if self.num_districts == len(self.district_centers):
+            rows = 2 * len(self.district_centers)
+            self.district_centers = _grow(self.district_centers, rows)
+            self.district_rates = _grow(self.district_rates, rows)
+            self.district_float = _grow(self.district_float, rows)
+            self.district_count = _grow(self.district_count, rows)
+            self.district_region = _grow(self.district_region, rows)
+
+        row = self.num_districts
+        self.num_districts += 1
+
+        self.district_region[row] = region.index
+        region.districts[district] = row
+
+        return row
+    # End of add_district().
+
+    def set_ratios(self, regions: Union[int, np.ndarray]) -> None:
+        """
+        Set the ratios of cases of the regions, in percent of confirmed.
+        Ratios of the regions with no confirmed cases are 0.
+        """
+        current = self.cases[regions, :, CURRENT]
+        confirmed = current[..., CONFIRMED, None]
+
+        ratios = np.divide(100 * current[..., ACTIVE:], confirmed,
+                           out=np.zeros(current[..., ACTIVE:].shape),
+                           where=confirmed != 0)
+
+        self.ratio_pc[regions, ACTIVE:] = round_pc(ratios)
+    # End of set_ratios().
+
+    def fill_vaccination_totals(
+        self,
+        regions: Union[int, Iterable[int]]  # Rows of the regions.
+    ) -> None:
+        """
+        Set the doses of all ages and all doses of the regions, by summing up
+        the doses of the age groups.
+        """
+        if not isinstance(regions, int):
+            regions = np.fromiter(regions, dtype=np.intp)
+
+        vaccination = self.vaccination[regions]
+
+        vaccination[..., ALL_AGES, DOSE_1:, :] = (
+            vaccination[..., AGE_18:, DOSE_1:, :].sum(axis=-3)
+        )
+        vaccination[..., ALL_DOSES, :] = (
+            vaccination[..., DOSE_1:, :].sum(axis=-2)
+        )
+
+        self.vaccination[regions] = vaccination
+    # End of fill_vaccination_totals().
+
+    def to_json(self, region: Region) -> dict[str, Any]:
+        """Make the dict of the region, in the shape of the output."""
+
+        i = region.index
+
+        data = {
+            "abbr": region.abbr,
+            "hindi": region.hindi,
+            "helpline": region.helpline,
+            "donate": region.donate,
+        }
+
+        cases = self.cases[i].tolist()
+        ratio_pc = self.ratio_pc[i].tolist()
+
+        for metric, name in enumerate(CASE_METRICS):
+            data[name] = dict(zip(CASE_FIELDS, cases[metric]))
+
+            if metric == DEATHS:
+                data[name]["reconciled"] = int(self.reconciled[i])
+            # Ratios are floats, but 0 if there are no confirmed cases (as
+            # they aren't calculated then).
+            if metric != CONFIRMED:
+                data[name]["ratio_pc"] = (ratio_pc[metric]
+                                          if cases[CONFIRMED][CURRENT] else 0)
+
+        vaccination = self.vaccination[i].tolist()
+
+        data["vaccination"] = {"centers": int(self.centers[i])}
+        for age, age_group in enumerate(AGE_GROUPS):
+            data["vaccination"][age_group] = {
+                dose: dict(zip(DOSE_FIELDS, vaccination[age][j]))
+                for j, dose in enumerate(DOSES)
+            }
+
+        rows = list(region.districts.values())
+        centers = self.district_centers[rows].tolist()
+        rates = self.district_rates[rows].tolist()
+        is_float = self.district_float[rows].tolist()
+
+        data["districts"] = {
+            district: {
+                "centers": num_centers,
+                **{name: rate if rate_is_float else int(rate)
+                   for name, rate, rate_is_float in zip(
+                       DISTRICT_RATES, district_rates, district_is_float
+                   )}
+            }
+            for district, num_centers, district_rates, district_is_float in (
+                zip(region.districts, centers, rates, is_float)
+            )
+        }
+
+        return data
+    # End of to_json().
+
+    def to_pretty(self, pretty: dict[str, Any]) -> dict[str, Any]:
+        """Make the output dict, with the regions in `pretty` made dicts."""
+        return {
+            key: self.to_json(value) if isinstance(value, Region) else value
+            for key, value in pretty.items()
+        }
+    # End of to_pretty().
+# End of StatsStore.
+
+
+# End of file.
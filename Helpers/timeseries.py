@@ -0,0 +1,106 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any
+
+# Import external dependencies.
+import pendulum
+
+# Import helper functions.
+from Helpers import json_io
+from Helpers.stats_store import (
+    ALL_AGES, CASE_METRICS, CURRENT, DOSES, TOTAL, Region, StatsStore,
+    region_file_names
+)
+
+
+# Each region has a file "timeseries/<abbr>.json", with a list for each
+# column (in the order of the days):
+#
+#   "state": Name of the region.
+#   "date": Like "2022_02_01", the name of the daily file of the day.
+#   "confirmed", "active", "recovered", "deaths": Cases as on the day.
+#   "all_doses", "1st_dose", "2nd_dose", "3rd_dose": Total doses (all ages).
+COLUMNS = ("date", *CASE_METRICS, *DOSES)
+
+
+def append_timeseries(
+    pretty: dict[str, Any],  # With the Region records (not the output dicts).
+    stats: StatsStore,
+    yesterday: pendulum.DateTime,  # Day of the stats.
+    output_root: Path
+) -> None:
+    """
+    Add the stats of the day to the time series of all the regions. Only the
+    day is added (or replaced, if it's already there), the daily files are
+    not read.
+
+    A time series which can't be decoded stops the run, instead of being
+    started again (which would lose its history). Raises ValueError (before
+    writing anything) if two regions have the same abbreviation.
+    """
+    date = yesterday.format("YYYY_MM_DD")
+
+    regions = [
+        (state, region) for state, region in pretty.items()
+        if isinstance(region, Region)
+    ]
+    rows = [region.index for _, region in regions]
+    names = region_file_names((state, region.abbr)
+                              for state, region in regions)
+
+    cases = stats.cases[rows, :, CURRENT].tolist()
+    doses = stats.vaccination[rows, ALL_AGES, :, TOTAL].tolist()
+
+    timeseries = output_root / "timeseries"
+    timeseries.mkdir(parents=True, exist_ok=True)
+
+    for (state, region), region_cases, region_doses in zip(regions, cases,
+                                                           doses):
+        path = timeseries / names[state]
+
+        try:
+            series = json_io.load(path)
+        except FileNotFoundError:
+            series = {"state": state, **{column: [] for column in COLUMNS}}
+
+        values = (date, *region_cases, *region_doses)
+
+        # Days are kept sorted, so usually this is the end of the lists.
+        i = bisect_left(series["date"], date)
+
+        if i < len(series["date"]) and series["date"][i] == date:
+            for column, value in zip(COLUMNS, values):
+                series[column][i] = value
+        else:
+            for column, value in zip(COLUMNS, values):
+                series[column].insert(i, value)
+
+        json_io.dump_compact(series, path)
+    # End of for loop.
+# End of append_timeseries().
+
+
+# End of file.
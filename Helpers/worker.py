@@ -0,0 +1,158 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import multiprocessing
+from multiprocessing.connection import Connection
+import resource
+import time
+from typing import Any, Callable, Optional
+
+# Import helper functions.
+from Helpers import http_client
+from Helpers.metrics import count, get_metrics, start_run
+
+
+class WorkerKilled(RuntimeError):
+    """Raised when the worker went over its limits (or died) and was killed."""
+    pass
+# End of WorkerKilled.
+
+
+# Default limits of a worker. Can be changed with the command line arguments.
+RSS_LIMIT_MB = 1024
+TIME_LIMIT = 5 * 60  # In seconds.
+
+# How often the parent checks the memory used by the worker, in seconds.
+POLL_INTERVAL = 0.1
+
+
+def get_rss_kb(pid: int) -> int:
+    """Current resident memory of the process, in KiB (0 if it's gone)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    return 0
+# End of get_rss_kb().
+
+
+def _work(conn: Connection, func: Callable[[Any], Any], arg: Any) -> None:
+    """Runs in the worker. Sends back the result (or the error) and stats."""
+    start_run()
+
+    try:
+        result = ("ok", func(arg))
+    except Exception as e:
+        result = ("error", e)
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((*result, peak_kb, get_metrics()["counters"]))
+    conn.close()
+# End of _work().
+
+
+def run_in_worker(
+    func: Callable[[Any], Any],  # Must be importable, i.e. module level.
+    arg: Any,
+    name: str,  # Used in logs and metrics.
+    rss_limit_mb: Optional[float] = None,
+    time_limit: Optional[float] = None
+) -> Any:
+    """
+    Run func(arg) in a separate process, and return the result.
+
+    Heavy libraries imported and memory used by the function stay in the
+    worker, and are freed when it exits. The worker is started fresh (spawn)
+    so that it doesn't inherit the memory of this process.
+
+    The worker is killed if its resident memory goes over the RSS limit, or
+    if it runs longer than the time limit (or the run's deadline, whichever
+    is earlier). Errors raised in the worker are raised here.
+
+    Peak memory of the worker is printed, and counted in the metrics as
+    `peak_rss_kb/{name}`. Counters of the worker are added to ours.
+    """
+    rss_limit_kb = (rss_limit_mb or RSS_LIMIT_MB) * 1024
+    deadline = time.monotonic() + min(time_limit or TIME_LIMIT,
+                                      http_client.remaining_time())
+
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_work, args=(child_conn, func, arg),
+                              name=f"lipik-{name}", daemon=True)
+    process.start()
+    child_conn.close()  # So that we get EOF if the worker dies.
+
+    peak_kb = 0
+    reason = None
+
+    try:
+        while not parent_conn.poll(POLL_INTERVAL):
+            peak_kb = max(peak_kb, get_rss_kb(process.pid))
+
+            if not process.is_alive():
+                reason = f"exited with code {process.exitcode}"
+            elif peak_kb > rss_limit_kb:
+                reason = f"used {peak_kb // 1024} MB (limit exceeded)"
+            elif time.monotonic() > deadline:
+                reason = "ran out of time"
+            else:
+                continue
+
+            break
+
+        if reason is None:
+            try:
+                status, result, worker_peak_kb, counters = parent_conn.recv()
+            except EOFError:  # Died just after we polled.
+                reason = "exited without result"
+
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        parent_conn.close()
+
+    if reason is not None:
+        print(f"Worker {name} killed: {reason}. "
+              f"Peak RSS {peak_kb // 1024} MB.")
+        count(f"peak_rss_kb/{name}", peak_kb)
+        raise WorkerKilled(f"Worker {name} {reason}.")
+
+    peak_kb = max(peak_kb, worker_peak_kb)
+    print(f"Worker {name} done. Peak RSS {peak_kb // 1024} MB.")
+    count(f"peak_rss_kb/{name}", peak_kb)
+
+    for counter, value in counters.items():
+        count(counter, value)
+
+    if status == "error":
+        raise result
+    return result
+# End of run_in_worker().
+
+
+# End of file.
@@ -0,0 +1,191 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import io
+import posixpath
+from typing import Iterator, Union
+from xml.etree import ElementTree
+import zipfile
+
+
+# Namespaces used in the XLSX XML files.
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = ("{http://schemas.openxmlformats.org/officeDocument/2006/"
+          "relationships}")
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+Cell = Union[str, int, float, bool]
+
+
+def get_sheet_path(xlsx: zipfile.ZipFile, sheet_name: str) -> str:
+    """Get the path of the sheet's XML in the zip, using the workbook."""
+
+    workbook = ElementTree.fromstring(xlsx.read("xl/workbook.xml"))
+    for sheet in workbook.iter(f"{MAIN_NS}sheet"):
+        if sheet.get("name") == sheet_name:
+            rel_id = sheet.get(f"{REL_NS}id")
+            break
+    else:
+        raise KeyError(f"No sheet named {sheet_name} in the XLSX.")
+
+    rels = ElementTree.fromstring(xlsx.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{PKG_REL_NS}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            break
+    else:
+        raise KeyError(f"No relationship {rel_id} in the XLSX.")
+
+    if target.startswith("/"):  # Absolute in the zip.
+        return target[1:]
+    return posixpath.normpath(posixpath.join("xl", target))
+# End of get_sheet_path().
+
+
+def read_shared_strings(xlsx: zipfile.ZipFile) -> list[str]:
+    """Get the shared strings table (empty if the XLSX has none)."""
+    try:
+        data = xlsx.read("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+
+    # Text of rich strings is split in runs, so join all <t> in the <si>.
+    # Phonetic hints (<rPh>) aren't part of the text.
+    strings = []
+    for item in ElementTree.fromstring(data).iter(f"{MAIN_NS}si"):
+        strings.append("".join(
+            t.text or "" for run in item
+            if run.tag != f"{MAIN_NS}rPh"
+            for t in run.iter(f"{MAIN_NS}t")
+        ))
+
+    return strings
+# End of read_shared_strings().
+
+
+def column_index(letters: str) -> int:
+    """Get the 1-based index of the column letters (A => 1, AA => 27)."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+# End of column_index().
+
+
+def column_letters(index: int) -> str:
+    """Get the letters of a 1-based column index (1 => A, 27 => AA)."""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+# End of column_letters().
+
+
+def cell_value(cell: ElementTree.Element, shared_strings: list[str]) -> Cell:
+    """
+    Get the typed value of the cell, same as pylightxl.
+
+    Numbers are int if they are whole numbers without a decimal point, and
+    float otherwise. Empty cells, errors and formula strings are str. Date
+    formats aren't applied, so dates are numbers.
+    """
+    cell_type = cell.get("t")
+
+    if cell_type == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{MAIN_NS}t"))
+
+    value = cell.find(f"{MAIN_NS}v")
+    value = (value.text or "") if value is not None else ""
+
+    if cell_type == "s":
+        return shared_strings[int(value)]
+    if cell_type == "b":
+        return value == "1"
+    if value == "" or cell_type in ("str", "e"):
+        return value
+
+    if value.removeprefix("-").isdigit():
+        return int(value)
+    return float(value)
+# End of cell_value().
+
+
+def iter_rows(
+    content: bytes,  # The XLSX file.
+    sheet_name: str,
+    columns: set[str]  # Letters of the columns needed, say {"B", "C"}.
+) -> Iterator[tuple[int, dict[str, Cell]]]:
+    """
+    Yield (row number, {column: value}) for rows of the sheet, in order.
+
+    The sheet XML is streamed from the zip in memory, and only the needed
+    columns are converted. Rows are dropped once yielded, so memory stays
+    small however big the sheet is. Rows missing in the XML (i.e. empty) are
+    not yielded, and neither are empty cells.
+    """
+    with zipfile.ZipFile(io.BytesIO(content)) as xlsx:
+        shared_strings = read_shared_strings(xlsx)
+
+        with xlsx.open(get_sheet_path(xlsx, sheet_name)) as sheet:
+            sheet_data = None
+            row_number = 0
+
+            events = ElementTree.iterparse(sheet, events=("start", "end"))
+            for event, element in events:
+                if event == "start":
+                    if element.tag == f"{MAIN_NS}sheetData":
+                        sheet_data = element
+                    continue
+
+                if element.tag != f"{MAIN_NS}row":
+                    continue
+
+                # "r" attributes are optional, they are sequential if absent.
+                row_number = int(element.get("r") or row_number + 1)
+
+                row = {}
+                column_number = 0
+
+                for cell in element.iter(f"{MAIN_NS}c"):
+                    if ref := cell.get("r"):
+                        column = ref.rstrip("0123456789")  # C12 => C
+                        column_number = column_index(column)
+                    else:
+                        column_number += 1
+                        column = column_letters(column_number)
+
+                    if column in columns:
+                        row[column] = cell_value(cell, shared_strings)
+
+                yield row_number, row
+
+                # Free the row, we don't need it anymore.
+                if sheet_data is not None:
+                    sheet_data.remove(element)
+                else:
+                    element.clear()
+# End of iter_rows().
+
+
+# End of file.
@@ -0,0 +1,416 @@
+###############################################################################
+
+# Copyright (C) 2022  Siddh Raman Pant
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The online repository may be found at <github.com/covid-saarani/lipik>.
+
+###############################################################################
+
+
+# Import standard library dependencies.
+import hashlib
+import io
+import json
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Optional
+
+# Note that pdfminer and camelot are imported only when needed.
+
+# Import helper functions.
+from Helpers.atomic_write import write_atomically
+from Helpers.metrics import count
+
+
+class InvalidPdfException(ValueError):
+    """Raised when the parsed PDF data isn't in the format we expect."""
+    pass
+# End of InvalidPdfException.
+
+
+# Version of the output of extract_tables(), for the stage cache. Bump it when
+# the extraction changes, so that results of the older code aren't reused.
+PARSER_VERSION = 2
+
+# Layout parameters for grouping characters into text lines, same as camelot
+# except for two. Vertical text isn't detected, as the PDF has none, and with
+# it on, short lines in a cell (say, "(12)" below a single letter) get grouped
+# as vertical text. Text boxes aren't ordered (boxes_flow), as that takes most
+# of the time and we order the lines ourselves.
+LAYOUT_PARAMS = {
+    "line_overlap": 0.5,
+    "char_margin": 1.0,
+    "line_margin": 0.5,
+    "word_margin": 0.1,
+    "boxes_flow": None,
+    "detect_vertical": False,
+    "all_texts": True,
+}
+
+# Rects thinner than this (in points) are ruling lines, not boxes.
+LINE_WIDTH = 2.0
+
+# Ruling lines closer than this (in points) are considered to be the same.
+TOLERANCE = 2.0
+
+# Grids of the tables from the last good parses, keyed by the page layout.
+# Persisted between runs by the CI cache.
+TEMPLATE_FILE = Path("./.cache/pdf_templates.json")
+MAX_TEMPLATES = 8  # Older layouts are dropped.
+
+
+def format_table(table: list[list[str]]) -> str:
+    """Format a table (list of columns) for logging in CI."""
+    return "\n".join(
+        " | ".join(repr(column[row]) for column in table)
+        for row in range(len(table[0]) if table else 0)
+    )
+# End of format_table().
+
+
+def validate_tables(
+    national_table: list[list[str]],  # List of columns.
+    states_table: list[list[str]]  # List of columns.
+) -> None:
+    """
+    Make sure we have tables parsed in the expected format.
+    See the example PDF file for the expected format.
+    """
+
+    # Check if state table is good.
+    if len(states_table) != 11 or len(states_table[0]) != 41:
+        print(format_table(states_table))  # For logging in CI.
+        raise InvalidPdfException("State-wise vaccination stats "
+                                  "not parsed correctly.")
+
+    # Check if national table is good.
+    if not (
+        len(national_table) == 6
+        and len(national_table[0]) == 5
+
+        # 18+ 1st and 2nd dose
+        and national_table[1][1] == "18+ Population"
+        and national_table[1][2].count("\n") == 1       # 1st Dose \n2nd Dose
+        and national_table[1][3].count("\n") == 1       # Numbers of doses.
+        and national_table[1][4].count("\n") in (3, 4)  # Last 24 hours stat.
+
+        # 15-18 1st and 2nd dose
+        and national_table[2][1] == "15-18 Years"
+        and national_table[2][2].count("\n") == 1  # Same as above...
+        and national_table[2][3].count("\n") == 1
+        and national_table[2][4].count("\n") in (3, 4)
+
+        # 12-14 1st and 2nd dose
+        and national_table[3][1] == "12-14 Years"
+        and national_table[3][2].count("\n") == 1
+        and national_table[3][3].count("\n") == 1
+        and national_table[3][4].count("\n") in (3, 4)
+
+        # 3rd dose (18+, 60+/worker)      "60+ Years, \n18-59 Years \nHCW, FLW"
+        and national_table[4][1] == "Precaution Dose"
+        and national_table[4][2].count("\n") == 2  # (The string above.)
+        and national_table[4][3].count("\n") == 1
+        and national_table[4][4].count("\n") in (3, 4)
+
+        and national_table[5][0] == "Total Doses"
+        and national_table[5][3].count("\n") == 0  # Number of total doses.
+        and national_table[5][4].count("\n") == 1  # Last 24 hours stat.
+    ):
+        print(format_table(national_table))  # For logging in CI.
+        raise InvalidPdfException("National vaccination stats "
+                                  "not parsed correctly.")
+# End of validate_tables().
+
+
+###############################################################################
+
+# Fast path: Read the text layer, and make the tables using ruling lines.
+
+
+def merge_positions(positions: list[float]) -> list[float]:
+    """Merge positions closer than the tolerance, returning sorted list."""
+    merged: list[float] = []
+    for position in sorted(positions):
+        if merged and position - merged[-1] <= TOLERANCE:
+            continue
+        merged.append(position)
+    return merged
+# End of merge_positions().
+
+
+def get_page_objects(
+    content: bytes
+) -> tuple[list[Any], list[tuple], str]:
+    """
+    Get text lines, ruling lines, and the layout key of the first page.
+
+    Ruling lines are returned as (x0, y0, x1, y1), and are either horizontal
+    (y0 == y1) or vertical (x0 == x1). Boxes are split into their 4 edges.
+
+    The layout key is the page size along with a hash of the text having no
+    digits (headings, state names, etc.), as only the numbers (and dates)
+    change from day to day.
+    """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LAParams, LTCurve, LTTextLine
+
+    page = next(extract_pages(io.BytesIO(content), page_numbers=[0],
+                              laparams=LAParams(**LAYOUT_PARAMS)))
+
+    text_lines = []
+    rulings = []
+
+    def walk(item: Any) -> None:
+        if isinstance(item, LTTextLine):
+            if item.get_text().strip():
+                text_lines.append(item)
+            return
+
+        if isinstance(item, LTCurve):  # LTLine and LTRect are LTCurve too.
+            x0, y0, x1, y1 = item.bbox
+            width, height = x1 - x0, y1 - y0
+
+            if height <= LINE_WIDTH and width > LINE_WIDTH:
+                y = (y0 + y1) / 2
+                rulings.append((x0, y, x1, y))
+            elif width <= LINE_WIDTH and height > LINE_WIDTH:
+                x = (x0 + x1) / 2
+                rulings.append((x, y0, x, y1))
+            elif width > LINE_WIDTH and height > LINE_WIDTH:
+                rulings.extend([(x0, y0, x1, y0), (x0, y1, x1, y1),
+                                (x0, y0, x0, y1), (x1, y0, x1, y1)])
+            return
+
+        for child in getattr(item, "_objs", ()):
+            walk(child)
+
+    walk(page)
+
+    labels = sorted(line.get_text().strip() for line in text_lines
+                    if not any(char.isdigit() for char in line.get_text()))
+    fingerprint = hashlib.sha256("\n".join(labels).encode()).hexdigest()
+    layout_key = f"{page.width:.0f}x{page.height:.0f}/{fingerprint[:16]}"
+
+    return text_lines, rulings, layout_key
+# End of get_page_objects().
+
+
+def find_grids(rulings: list[tuple]) -> list[dict[str, list[float]]]:
+    """
+    Find the tables from the ruling lines, and return their grids.
+
+    Tables are expected to be one below the other, so they are separated by
+    merging the vertical extents of the vertical lines. Each grid has column
+    boundaries (left to right) and row boundaries (top to bottom), and the
+    grids are sorted from top to bottom of the page.
+    """
+    verticals = [r for r in rulings if r[0] == r[2]]
+    horizontals = [r for r in rulings if r[1] == r[3]]
+
+    # Merge overlapping vertical extents, each merged extent is a table.
+    extents: list[list[float]] = []
+    for _, y0, _, y1 in sorted(verticals, key=lambda r: r[1]):
+        if extents and y0 <= extents[-1][1] + TOLERANCE:
+            extents[-1][1] = max(extents[-1][1], y1)
+        else:
+            extents.append([y0, y1])
+
+    grids = []
+
+    for bottom, top in sorted(extents, key=lambda e: -e[1]):
+        def inside(y: float) -> bool:
+            return bottom - TOLERANCE <= y <= top + TOLERANCE
+
+        xs = merge_positions([x for x, y0, _, y1 in verticals
+                              if inside(y0) and inside(y1)])
+        ys = merge_positions([y for x0, y, x1, _ in horizontals
+                              if inside(y) and x0 < xs[-1] and x1 > xs[0]])
+
+        if len(xs) < 2 or len(ys) < 2:
+            continue  # Not a table, just some box.
+
+        grids.append({"cols": xs, "rows": ys[::-1]})
+
+    return grids
+# End of find_grids().
+
+
+def fill_grid(text_lines: list[Any],
+              grid: dict[str, list[float]]) -> list[list[str]]:
+    """
+    Put the text lines in the cells of the grid, returning list of columns.
+
+    Like camelot, the row is chosen by the vertical center of the text line,
+    and the column by the most overlap relative to the column width. Lines in
+    a cell are joined by newlines, from top to bottom.
+    """
+    cols = list(zip(grid["cols"], grid["cols"][1:]))
+    rows = list(zip(grid["rows"], grid["rows"][1:]))  # (top, bottom)
+
+    cells = [[[] for _ in rows] for _ in cols]
+
+    for line in sorted(text_lines, key=lambda t: (-t.y0, t.x0)):
+        y_center = (line.y0 + line.y1) / 2
+
+        for r, (top, bottom) in enumerate(rows):
+            if bottom < y_center < top:
+                break
+        else:
+            continue  # Not in this table.
+
+        overlaps = [
+            (min(x1, line.x1) - max(x0, line.x0)) / (x1 - x0)
+            if x0 <= line.x1 and x1 >= line.x0 else -1
+            for x0, x1 in cols
+        ]
+        if max(overlaps) == -1:
+            continue  # Not in this table.
+
+        cells[overlaps.index(max(overlaps))][r].append(line.get_text())
+
+    return [["".join(cell).strip() for cell in column] for column in cells]
+# End of fill_grid().
+
+
+def load_template(
+    template_file: Path,
+    layout_key: str
+) -> list[dict[str, list[float]]]:
+    """Get the grids stored for the layout, or empty list if none."""
+    try:
+        templates = json.loads(template_file.read_text())
+    except (FileNotFoundError, ValueError):
+        return []
+    return templates.get(layout_key, [])
+# End of load_template().
+
+
+def save_template(
+    template_file: Path,
+    layout_key: str,
+    grids: list[dict[str, list[float]]]
+) -> None:
+    """Store the grids of a good parse for the layout."""
+    try:
+        templates = json.loads(template_file.read_text())
+    except (FileNotFoundError, ValueError):
+        templates = {}
+
+    templates.pop(layout_key, None)  # So that it becomes the newest.
+    templates[layout_key] = grids
+    templates = dict(list(templates.items())[-MAX_TEMPLATES:])
+
+    template_file.parent.mkdir(parents=True, exist_ok=True)
+    write_atomically(template_file, json.dumps(templates).encode())
+# End of save_template().
+
+
+###############################################################################
+
+# Slow path: Use camelot (lattice mode).
+
+
+def read_camelot(
+    content: bytes
+) -> tuple[list[list[list[str]]], list[dict[str, list[float]]]]:
+    """
+    Parse the tables with camelot, which rasterises the page for lines.
+
+    The grids detected by camelot are returned too, in PDF coordinates.
+    """
+    import camelot
+
+    pdf = NamedTemporaryFile(suffix=".pdf")
+    pdf.write(content)
+    pdf.flush()
+
+    # Parse the table from the pdf. Linux needed for using an open file.
+    tables = camelot.read_pdf(pdf.name, backend="poppler")
+    pdf.close()  # We no longer need it. Also will delete the same.
+
+    if len(tables) != 2:
+        raise InvalidPdfException("There must be 2 tables.")
+
+    if 0 < tables[0].accuracy < 95 or 0 < tables[1].accuracy < 90:
+        print(f"National table accuracy = {tables[0].accuracy}%")
+        print(f"State table accuracy = {tables[1].accuracy}%")
+        raise InvalidPdfException("Cannot detect the tables accurately.")
+
+    # Columns are (left, right) and rows are (top, bottom), in order.
+    grids = [
+        {"cols": [col[0] for col in table.cols] + [table.cols[-1][1]],
+         "rows": [row[0] for row in table.rows] + [table.rows[-1][1]]}
+        for table in tables
+    ]
+
+    return [
+        [table.df[col].tolist() for col in table.df.columns]
+        for table in tables
+    ], grids
+# End of read_camelot().
+
+
+def extract_tables(
+    content: bytes,
+    template_file: Optional[Path] = None  # None => TEMPLATE_FILE.
+) -> list[list[list[str]]]:
+    """
+    Parse the national and state tables from the PDF, and validate them.
+
+    If we have the grids of an earlier good parse of the same layout, the
+    text is simply put in them. Else (or if that doesn't pass the checks),
+    the grids are found from the ruling lines in the PDF, and if even that
+    doesn't pass the checks, camelot is used. The grids of a good parse are
+    stored for the next runs.
+
+    Tables are returned as a list of columns, so that table[col][row] works
+    just like with the DataFrames.
+    """
+    template_file = template_file or TEMPLATE_FILE
+    text_lines, rulings, layout_key = get_page_objects(content)
+
+    if grids := load_template(template_file, layout_key):
+        try:
+            tables = [fill_grid(text_lines, grid) for grid in grids]
+            validate_tables(*tables)
+        except InvalidPdfException as e:
+            print(f"Stored template didn't fit ({e}), detecting again.")
+        else:
+            count("cache_hits/pdf_template")
+            return tables
+
+    try:
+        grids = find_grids(rulings)
+        if len(grids) != 2:
+            raise InvalidPdfException(f"There must be 2 tables, found "
+                                      f"{len(grids)} in the text layer.")
+
+        tables = [fill_grid(text_lines, grid) for grid in grids]
+        validate_tables(*tables)
+
+    except InvalidPdfException as e:
+        print(f"Text layer parsing failed ({e}), using camelot.")
+
+        tables, grids = read_camelot(content)
+        validate_tables(*tables)
+
+    save_template(template_file, layout_key, grids)
+
+    return tables
+# End of extract_tables().
+
+
+# End of file.
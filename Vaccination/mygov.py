@@ -25,31 +25,21 @@ from typing import Any
 
 # Import external dependencies.
 import pendulum
-import requests
 
-# Import helper function.
-from Helpers.fuzzy_find_name import find_name
-
-
-def set_all_doses(age_data: dict[str, Any]) -> None:
-    """Populate all_doses dict."""
-
-    age_data["all_doses"]["total"] = (
-        age_data["1st_dose"]["total"]
-        + age_data["2nd_dose"]["total"]
-        + age_data["3rd_dose"]["total"]
-    )
-
-    age_data["all_doses"]["new"] = (
-        age_data["1st_dose"]["new"]
-        + age_data["2nd_dose"]["new"]
-        + age_data["3rd_dose"]["new"]
-    )
-# End of set_all_doses().
+# Import helper functions.
+from Helpers.fetch import get_payload
+from Helpers import json_io
+from Helpers.aliases import resolve_names
+from Helpers.metrics import count
+from Helpers.stats_store import (
+    AGE_12, AGE_15, AGE_18, ALL_AGES, ALL_DOSES, DOSE_1, DOSE_2, DOSE_3, NEW,
+    TOTAL, StatsStore
+)
 
 
 def set_data_from_keys(
-    state_stats: dict[str, Any],
+    stats: StatsStore,
+    region: int,  # Row of the region in the stats store.
     data: dict[str, Any],
 
     # Total
@@ -75,95 +65,43 @@ def set_data_from_keys(
     """
     Given keys, set data.
     """
-    state_all = state_stats["all_ages"]
-    state_18 = state_stats["18+"]
-    state_15 = state_stats["15-18"]
-    state_12 = state_stats["12-14"]
+    vaccination = stats.vaccination[region]  # View of the row.
 
     # Helper function.
     def get_data(key: str) -> int:
         return int(data[key])
     # End of get_data().
 
+    # Helper function, sets total and new doses.
+    def set_dose(age: int, dose: int, key_curr: str, key_prev: str) -> None:
+        curr = get_data(key_curr)
+        vaccination[age, dose] = (curr, curr - get_data(key_prev))
+    # End of set_dose().
+
     ###########################################################################
 
     # Set 18+ stats.
 
-    state_18["1st_dose"]["total"] = get_data(key_curr_dose1_18)
-    state_18["1st_dose"]["new"] = (
-        get_data(key_curr_dose1_18) - get_data(key_prev_dose1_18)
-    )
+    set_dose(AGE_18, DOSE_1, key_curr_dose1_18, key_prev_dose1_18)
+    set_dose(AGE_18, DOSE_2, key_curr_dose2_18, key_prev_dose2_18)
 
-    state_18["2nd_dose"]["total"] = get_data(key_curr_dose2_18)
-    state_18["2nd_dose"]["new"] = (
-        get_data(key_curr_dose2_18) - get_data(key_prev_dose2_18)
-    )
-
-    state_18["3rd_dose"]["total"] = (
-        get_data(key_curr_dose3_18) + get_data(key_curr_dose3_60)
-    )
-    state_18["3rd_dose"]["new"] = (
-        get_data(key_curr_dose3_18) + get_data(key_curr_dose3_60)
-        - get_data(key_prev_dose3_18) - get_data(key_prev_dose3_60)
-    )
-
-    set_all_doses(state_18)
-
-    ###########################################################################
+    curr_dose3 = get_data(key_curr_dose3_18) + get_data(key_curr_dose3_60)
+    prev_dose3 = get_data(key_prev_dose3_18) + get_data(key_prev_dose3_60)
+    vaccination[AGE_18, DOSE_3] = (curr_dose3, curr_dose3 - prev_dose3)
 
     # Now set 15-18 stats.
 
-    state_15["1st_dose"]["total"] = get_data(key_curr_dose1_15)
-    state_15["1st_dose"]["new"] = (
-        get_data(key_curr_dose1_15) - get_data(key_prev_dose1_15)
-    )
-
-    state_15["2nd_dose"]["total"] = get_data(key_curr_dose2_15)
-    state_15["2nd_dose"]["new"] = (
-        get_data(key_curr_dose2_15) - get_data(key_prev_dose2_15)
-    )
-
-    set_all_doses(state_15)
-
-    ###########################################################################
+    set_dose(AGE_15, DOSE_1, key_curr_dose1_15, key_prev_dose1_15)
+    set_dose(AGE_15, DOSE_2, key_curr_dose2_15, key_prev_dose2_15)
 
     # Now set 12-14 stats.
 
-    state_12["1st_dose"]["total"] = get_data(key_curr_dose1_12)
-    state_12["1st_dose"]["new"] = (
-        get_data(key_curr_dose1_12) - get_data(key_prev_dose1_12)
-    )
+    set_dose(AGE_12, DOSE_1, key_curr_dose1_12, key_prev_dose1_12)
+    set_dose(AGE_12, DOSE_2, key_curr_dose2_12, key_prev_dose2_12)
 
-    state_12["2nd_dose"]["total"] = get_data(key_curr_dose2_12)
-    state_12["2nd_dose"]["new"] = (
-        get_data(key_curr_dose2_12) - get_data(key_prev_dose2_12)
-    )
+    # Now set all doses, as well as all ages data.
 
-    set_all_doses(state_12)
-
-    ###########################################################################
-
-    # Now set all ages data.
-
-    # Helper function
-    def add_data_all(dose_key: str, stat_key: str) -> int:
-        return (
-            state_18[dose_key][stat_key]
-            + state_15[dose_key][stat_key]
-            + state_12[dose_key][stat_key]
-        )
-    # End of add_data_all().
-
-    state_all["1st_dose"]["total"] = add_data_all("1st_dose", "total")
-    state_all["1st_dose"]["new"] = add_data_all("1st_dose", "new")
-
-    state_all["2nd_dose"]["total"] = add_data_all("2nd_dose", "total")
-    state_all["2nd_dose"]["new"] = add_data_all("2nd_dose", "new")
-
-    state_all["3rd_dose"]["total"] = add_data_all("3rd_dose", "total")
-    state_all["3rd_dose"]["new"] = add_data_all("3rd_dose", "new")
-
-    set_all_doses(state_all)
+    stats.fill_vaccination_totals(region)
 
     ###########################################################################
 
@@ -172,15 +110,17 @@ def set_data_from_keys(
     all_total = get_data(key_curr_dose_all)
     all_new = all_total - get_data(key_prev_dose_all)
 
-    assert all_total == state_all["all_doses"]["total"]
-    assert all_new == state_all["all_doses"]["new"]
+    assert all_total == vaccination[ALL_AGES, ALL_DOSES, TOTAL]
+    assert all_new == vaccination[ALL_AGES, ALL_DOSES, NEW]
 # End of set_data_from_keys()
 
 
 def fill_mygov_data(pretty: dict[str, Any]) -> None:
     """Get state vaccination stats from MyGov JSON, and fill it in `pretty`."""
 
-    stats = requests.get(pretty["internal"]["mygov_vaccination"]).json()
+    store = pretty["internal"]["stats"]
+    stats = json_io.loads(get_payload(pretty, "mygov_vaccination"))
+    count("rows_parsed/mygov_vaccination", len(stats["vacc_st_data"]))
 
     # Set timestamp.
     pretty["timestamp"]["vaccination"] = {
@@ -192,7 +132,7 @@ def fill_mygov_data(pretty: dict[str, Any]) -> None:
 
     # Set national data
     set_data_from_keys(
-        pretty["All"]["vaccination"], stats,
+        store, pretty["All"].index, stats,
 
         # Total
         "india_total_doses", "india_last_total_doses",
@@ -219,14 +159,18 @@ def fill_mygov_data(pretty: dict[str, Any]) -> None:
     pretty_states_set = set(pretty.keys()) - {"All", "internal", "timestamp"}
     pretty_states_tuple = tuple(pretty_states_set)
 
+    # Match all the state names to ours at once.
+    states = resolve_names(
+        "mygov_vaccination",
+        (data["st_name"] for data in stats["vacc_st_data"]),
+        pretty_states_tuple
+    )
+
     for data in stats["vacc_st_data"]:
-        if data["st_name"] in pretty_states_set:
-            state = data["st_name"]
-        else:
-            state = find_name(data["st_name"], pretty_states_tuple)
+        state = states[data["st_name"]]
 
         set_data_from_keys(
-            pretty[state]["vaccination"], data,
+            store, pretty[state].index, data,
 
             # Total
             "total_doses", "last_total_doses",
@@ -23,28 +23,34 @@
 # Import standard library dependencies.
 from typing import Any
 
-# Import external dependencies.
-import requests
-
-# Import helper function.
-from Helpers.fuzzy_find_name import find_name
+# Import helper functions.
+from Helpers.fetch import get_payload
+from Helpers import json_io
+from Helpers.aliases import resolve_names
+from Helpers.metrics import count
 
 
 def fill_state_centers(pretty: dict[str, Any]) -> None:
-    """Fetches number of centers in states, and puts them in `pretty`."""
-    centers = requests.get(pretty["internal"]["mygov_state_centers"]).json()
+    """Gets number of centers in states, and puts them in `pretty`."""
+    centers = json_io.loads(get_payload(pretty, "mygov_state_centers"))
+    count("rows_parsed/mygov_state_centers", len(centers))
 
     pretty_states_set = set(pretty.keys()) - {"All", "internal", "timestamp"}
     pretty_states_tuple = tuple(pretty_states_set)
 
+    # Match all the state names to ours at once.
+    states = resolve_names("mygov_state_centers",
+                           (i["state_name"] for i in centers),
+                           pretty_states_tuple)
+
+    stats = pretty["internal"]["stats"]
+    national = pretty["All"].index
+
     for i in centers:
-        if i["state_name"] in pretty_states_set:
-            state_name = i["state_name"]
-        else:
-            state_name = find_name(i["state_name"], pretty_states_tuple)
+        state_name = states[i["state_name"]]
 
-        pretty[state_name]["vaccination"]["centers"] += i["centers"]
-        pretty["All"]["vaccination"]["centers"] += i["centers"]  # Nationally.
+        stats.centers[pretty[state_name].index] += i["centers"]
+        stats.centers[national] += i["centers"]  # Nationally.
 # End of fill_state_centers()
 
 
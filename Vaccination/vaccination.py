@@ -23,11 +23,11 @@
 # Import standard library dependencies.
 from typing import Any
 
-# Import external dependencies.
-import pendulum
+# Import helper functions.
+from Helpers.metrics import span
 
 # Import the main filling functions.
-from .mohfw import fill_mohfw_data
+# Note that MoHFW one is imported only when needed, as it pulls in camelot.
 from .mygov import fill_mygov_data
 from .mygov_centers import fill_state_centers
 
@@ -45,12 +45,16 @@ def fill_vaccination(pretty: dict[str, Any]) -> None:
 
     Regardless, number of centers in the states is fetched from MyGov.
     """
-    fill_state_centers(pretty)
+    with span("parse/mygov_state_centers"):
+        fill_state_centers(pretty)
 
     if pretty["internal"]["use_mygov"]:
-        fill_mygov_data(pretty)
+        with span("parse/mygov_vaccination"):
+            fill_mygov_data(pretty)
     else:
-        fill_mohfw_data(pretty)
+        from .mohfw import fill_mohfw_data
+        with span("parse/mohfw_vaccination"):
+            fill_mohfw_data(pretty)
 # End of fill_vaccination()
 
 
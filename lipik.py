@@ -24,216 +24,448 @@
 
 
 # Import standard library dependencies.
-import copy
-import json
+import argparse
 from pathlib import Path
+from typing import Any, Optional
 
 # Import external dependencies.
-from bs4 import BeautifulSoup
 import pendulum
-import requests
 
 # Import the populator functions.
 from Cases.cases import fill_cases
 from District.districts import fill_district_data
+from Helpers.aliases import load_aliases, save_aliases
+from Helpers.fetch import fetch_sources
+from Helpers.http_client import set_deadline
+from Helpers import json_io
+from Helpers.json_patch import make_patch
+from Helpers.metrics import count, span, start_run, write_metrics
+from Helpers.precompress import compressed_paths, precompress
+from Helpers.probe import probe_upstream, save_fingerprint
+from Helpers.stats_store import StatsStore, region_file_names
+from Helpers.timeseries import append_timeseries
+from Helpers import worker
 from Vaccination.vaccination import fill_vaccination
 
 
-# Check whether we already have the data from MyGov for today.
-# We start fetching at 8AM.
+def parse_args() -> argparse.Namespace:
+    """Parse the command line arguments."""
 
-latest = Path("../saarani/latest.json")
+    parser = argparse.ArgumentParser(
+        description="Fetch COVID-19 data from official Indian government "
+                    "sources, and store it in the Saarani folder."
+    )
+
+    parser.add_argument(
+        "--replay", metavar="ROOT",
+        help="replay the sources from a local directory or a local HTTP "
+             "server instead of the government servers (see Example/ for "
+             "the file names); the freshness checks are skipped, and "
+             "--output must be given"
+    )
+    parser.add_argument(
+        "--output", metavar="ROOT", type=Path,
+        help="where to write the data (default: ../saarani, except when "
+             "replaying)"
+    )
+    parser.add_argument(
+        "--metrics", metavar="DIR", type=Path, default=Path("./Metrics"),
+        help="where to write the timings and counters of the run, one file "
+             "per run (default: ./Metrics)"
+    )
+    parser.add_argument(
+        "--pdf-rss-limit", metavar="MB", type=float,
+        help="kill the worker parsing the vaccination PDF if it uses more "
+             f"memory than this (default: {worker.RSS_LIMIT_MB})"
+    )
+    parser.add_argument(
+        "--pdf-time-limit", metavar="SECONDS", type=float,
+        help="kill the worker parsing the vaccination PDF if it runs longer "
+             f"than this (default: {worker.TIME_LIMIT})"
+    )
+
+    args = parser.parse_args()
+
+    # Don't let a replay overwrite the published data by default.
+    if args.output is None:
+        if args.replay:
+            parser.error("--output is required with --replay")
+        args.output = Path("../saarani")
+
+    return args
+# End of parse_args().
+
+
+def already_fetched(output_root: Path) -> bool:
+    """
+    Check whether we already have the data from MyGov for today.
+    We start fetching at 8AM.
+    """
 
-today = pendulum.now("Asia/Kolkata")
-if today.hour < 8:
-    today = today.subtract(days=1)
+    today = pendulum.now("Asia/Kolkata")
+    if today.hour < 8:
+        today = today.subtract(days=1)
+
+    try:
+        latest = json_io.load(output_root / "latest.json")
+    except FileNotFoundError:
+        return False
+
+    latest_cases = latest["timestamp"]["cases"]
 
-with open(latest) as f:
-    latest_cases = json.load(f)["timestamp"]["cases"]
     latest_fetched = pendulum.from_timestamp(latest_cases["last_fetched_unix"],
                                              tz="Asia/Kolkata")
-    if (
+
+    return (
         latest_cases["primary_source"] == "mygov"
         and today.date() == latest_fetched.date()
-    ):
-        print("Data already fetched for today, exiting.")
-        exit(0)
+    )
+# End of already_fetched().
+
+
+def make_pretty(
+    output_root: Path,
+    replay_root: Optional[str],
+    pdf_rss_limit_mb: Optional[float] = None,
+    pdf_time_limit: Optional[float] = None
+) -> dict[str, Any]:
+    """Make the `pretty` dict with defaults, to be filled later."""
 
+    pretty = {}  # Formatted dict containing all data for a state.
+    pretty["timestamp"] = {}  # For storing timestamps of data.
 
-pretty = {}  # Formatted dict containing all data for a state.
-pretty["timestamp"] = {}  # For storing timestamps of data.
+    # Make a dict for internal use, will delete later.
 
-# Make a dict for internal use, will delete later.
+    mygov_url = "https://www.mygov.in/sites/default/files/covid/"
+    yesterday = pendulum.yesterday("Asia/Kolkata")
+    day_before_yesterday = yesterday.subtract(days=1)
 
-mygov_url = "https://www.mygov.in/sites/default/files/covid/"
-yesterday = pendulum.yesterday("Asia/Kolkata")
-day_before_yesterday = yesterday.subtract(days=1)
+    pretty["internal"] = {
+        "use_mygov": True,
 
-pretty["internal"] = {
-    "use_mygov": True,
+        "mygov_cases": mygov_url + "covid_state_counts_ver1.json",
+        "mygov_vaccination": mygov_url + "vaccine/vaccine_counts_today.json",
+        "mygov_state_centers": mygov_url + "vaccine/vaccination_states.json",
+        "mygov_district_centers": (mygov_url
+                                   + "vaccine/vaccination_districts.json"),
+        "mohfw_cases": "https://www.mohfw.gov.in/data/datanew.json",
 
-    "mygov_cases": mygov_url + "covid_state_counts_ver1.json",
-    "mygov_vaccination": mygov_url + "vaccine/vaccine_counts_today.json",
-    "mygov_state_centers": mygov_url + "vaccine/vaccination_states.json",
-    "mygov_district_centers": mygov_url + "vaccine/vaccination_districts.json",
-    "mohfw_cases": "https://www.mohfw.gov.in/data/datanew.json",
+        "replay_root": replay_root,  # If not None, sources are read from it.
+        "output_root": output_root,
 
-    "yesterday": yesterday,
-    "day_before_yesterday": day_before_yesterday,
+        # Limits of the worker parsing the vaccination PDF. None => default.
+        "pdf_rss_limit_mb": pdf_rss_limit_mb,
+        "pdf_time_limit": pdf_time_limit,
 
-    "old_filename": (
-        "../saarani/Daily/"
-        + day_before_yesterday.format("YYYY_MM_DD")
-        + ".json"
+        # Where the grids of the PDF layouts are stored (see
+        # Vaccination/mohfw_pdf.py). None => default.
+        "pdf_template_file": None,
+
+        "yesterday": yesterday,
+        "day_before_yesterday": day_before_yesterday,
+
+        "old_filename": (
+            output_root / "Daily"
+            / (day_before_yesterday.format("YYYY_MM_DD") + ".json")
+        )
+    }
+
+    # Make the record for national data (Same is used for state data).
+    # National stats will be filled later as we populate state stats. The
+    # stats are kept in the store, and made into dicts only when writing (see
+    # Helpers/stats_store.py for the structure).
+
+    stats = pretty["internal"]["stats"] = StatsStore()
+
+    pretty["All"] = stats.add_region(
+        "IN",  # State code (2 letter abbreviation).
+        "भारत",  # Name of state in Hindi. Useful for l10n.
+        "1075, 011-23978046",  # State helpline for COVID.
+        "https://www.pmcares.gov.in/"  # For donating to state funds.
     )
-}
-
-# Parse MoHFW website and get the requisite links.
-soup = BeautifulSoup(requests.get("https://www.mohfw.gov.in").text, "lxml")
-for link_tag in soup.findAll("a"):
-
-    if "District-wise COVID-19 test positivity rates" in str(link_tag):
-        pretty["internal"]["mohfw_xlsx"] = link_tag.get("href")
-
-    elif "Vaccination State Data" in str(link_tag):
-        pretty["internal"]["mohfw_vaccination"] = link_tag.get("href")
-
-
-# Make a dict for national data (Same structure used for state data).
-# National stats will be filled later as we populate state stats.
-
-pretty["All"] = {
-    # Collapse / Fold this for skipping / better readability of later code.
-    # Check the parsing functions to understand better as we populate the dict.
-
-    "abbr": "IN",  # State code (2 letter abbreviation).
-    "hindi": "भारत",  # Name of state in Hindi. Useful for l10n.
-    "helpline": "1075, 011-23978046",  # State helpline for COVID.
-    "donate": "https://www.pmcares.gov.in/",   # For donating to state funds.
-
-    "confirmed": {
-        "current": 0,     # As on the previous day of logging (say, 100).
-        "previous": 0,    # As on the day before yesterday day (say, 70).
-        "delta": 0,       # Change in cases (for the examples above, +30).
-    },
 
-    "active": {
-        "current": 0,
-        "previous": 0,
-        "delta": 0,
-        "ratio_pc": 0
-    },
+    # For data not linked to any state.
+    pretty["Miscellaneous"] = stats.add_region("misc", "इत्यादि", "", "")
+
+    return pretty
+# End of make_pretty().
+
+
+def make_dashboard(pretty: dict[str, Any]) -> list[dict[str, Any]]:
+    """Make dashboard json (an unnested json)."""
+
+    dashboard = []
+
+    for state in pretty.keys():
+        if state == "timestamp":
+            continue
+
+        vaccination_all = pretty[state]["vaccination"]["all_ages"]["all_doses"]
+
+        dashboard.append({
+            "State": "All over India" if state == "All" else state,
+
+            "Active (Total)": pretty[state]["active"]["current"],
+            "Active (Change)": pretty[state]["active"]["delta"],
+
+            "Recovered (Total)": pretty[state]["recovered"]["current"],
+            "Recovered (Change)": pretty[state]["recovered"]["delta"],
+
+            "Deaths (Total)": pretty[state]["deaths"]["current"],
+            "Deaths (Change)": pretty[state]["deaths"]["delta"],
+
+            "Overall (Total)": pretty[state]["confirmed"]["current"],
+            "Overall (Change)": pretty[state]["confirmed"]["delta"],
+
+            "Vaccinations (Total)": vaccination_all["total"],
+            "Vaccinations (New)": vaccination_all["new"],
+        })
+
+    return dashboard
+# End of make_dashboard().
+
+
+def write_shards(
+    pretty: dict[str, Any],
+    names: dict[str, str],  # {state: file name}, see region_file_names().
+    shard_dir: Path
+) -> None:
+    """
+    Write the data of each state in its own file, like "Daily/<date>/KL.json"
+    (as {state: data}), so that clients can fetch only the states they need.
+
+    National data and timestamps are written in "index.json", along with the
+    file names of the states. Files are minified, and written only if their
+    content has changed.
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    for state, name in names.items():
+        if json_io.dump_compact_if_changed({state: pretty[state]},
+                                           shard_dir / name):
+            count("shards_written")
+        else:
+            count("cache_hits/shards")
+
+    index = {
+        "timestamp": pretty["timestamp"],
+        "All": pretty["All"],
+        "states": names,
+    }
+    json_io.dump_compact_if_changed(index, shard_dir / "index.json")
+
+    # Remove the files of states which aren't there anymore.
+    keep = set(names.values()) | {"index.json"}
+    for path in shard_dir.glob("*.json"):
+        if path.name not in keep:
+            path.unlink()
+# End of write_shards().
+
+
+def write_delta(
+    pretty: dict[str, Any],
+    daily: Path,  # The daily file of this run.
+    old_filename: Path  # The daily file of the day before.
+) -> Optional[Path]:
+    """
+    Write the JSON Patch (RFC 6902) from the daily file of the day before to
+    this one in "Deltas/<date>.json", so that mirrors can apply it instead of
+    downloading the whole file. Returns the path, or None if the file of the
+    day before isn't there.
+
+    The deltas available are listed in "Deltas/index.json", as:
+        {<date>: {"from": <daily file>, "to": <daily file>, "ops": <count>}}
+    """
+    try:
+        old = json_io.load(old_filename)
+    except FileNotFoundError:
+        print(f"{old_filename} not found, not writing the delta.")
+        return None
+
+    deltas = daily.parent.parent / "Deltas"
+    deltas.mkdir(parents=True, exist_ok=True)
+
+    patch = make_patch(old, pretty)
+    delta = deltas / daily.name
+    json_io.dump_compact(patch, delta)
+
+    count("delta_ops", len(patch))
+
+    # Update the manifest, dropping the deltas which aren't there anymore.
+
+    manifest_path = deltas / "index.json"
+
+    try:
+        manifest = json_io.load(manifest_path)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    manifest[daily.stem] = {
+        "from": f"Daily/{old_filename.name}",
+        "to": f"Daily/{daily.name}",
+        "ops": len(patch),
+    }
+    manifest = {
+        date: manifest[date] for date in sorted(manifest)
+        if (deltas / f"{date}.json").exists()
+    }
+
+    json_io.dump_compact(manifest, manifest_path)
+
+    return delta
+# End of write_delta().
+
+
+def write_outputs(
+    pretty: dict[str, Any],
+    yesterday: pendulum.DateTime,
+    output_root: Path,
+    old_filename: Path  # Daily file of the day before yesterday.
+) -> None:
+    """
+    Save the data and the dashboard in the output folder.
+
+    Raises ValueError (before writing anything) if two regions have the same
+    abbreviation, as the files of the regions are named by them.
+    """
+
+    # Names of the files of the regions, checked before anything is written.
+    names = region_file_names(
+        (region, data["abbr"]) for region, data in pretty.items()
+        if region != "timestamp"
+    )
+
+    # Save the data in JSON, and make "latest.json" symlink point to it.
+    # Minified variants are saved too (with ".min.json" extension), for the
+    # clients polling the API.
+
+    daily = output_root / "Daily" / f"{yesterday.format('YYYY_MM_DD')}.json"
+
+    with span("write/daily"):
+        daily.parent.mkdir(parents=True, exist_ok=True)
+        json_io.dump_both(pretty, daily)
+
+    # Save the data of each state separately too, in "Daily/<date>/".
+
+    with span("write/shards"):
+        write_shards(pretty,
+                     {state: name for state, name in names.items()
+                      if state != "All"},
+                     daily.with_suffix(""))
+
+    # Save the changes since the day before, for the mirrors.
+
+    with span("write/delta"):
+        delta = write_delta(pretty, daily, old_filename)
+
+    # Save dashboard in "dashboard.json".
+
+    dashboard = output_root / "dashboard.json"
+
+    with span("write/dashboard"):
+        json_io.dump_both(make_dashboard(pretty), dashboard)
+
+    # Save the gzip and brotli compressed files next to them, for the static
+    # hosts to serve.
+
+    written = [daily, json_io.compact_path(daily),
+               dashboard, json_io.compact_path(dashboard)]
+    if delta is not None:
+        written.append(delta)
 
-    "recovered": {
-        "current": 0,
-        "previous": 0,
-        "delta": 0,
-        "ratio_pc": 0
-    },
+    with span("write/precompress"):
+        precompress(written)
 
-    "deaths": {
-        "current": 0,
-        "previous": 0,
-        "delta": 0,
-        "reconciled": 0,
-        "ratio_pc": 0
-    },
+    # Make the "latest" symlinks, for all the variants of the daily file.
 
-    "vaccination": {
-        "centers": 0,  # Number of vaccination centers.
+    for path in (daily, json_io.compact_path(daily)):
+        for target in (path, *compressed_paths(path)):
+            # Say, "latest.min.json.gz" => "./Daily/2022_02_01.min.json.gz".
+            link = output_root / target.name.replace(daily.stem, "latest", 1)
+            link.unlink(missing_ok=True)
+            link.symlink_to(Path(f"./Daily/{target.name}"))
+# End of write_outputs().
 
-        "all_ages": {  # Self explanatory fields. "new" => Last 24 hours.
-            "all_doses": {"total": 0, "new": 0},
-            "1st_dose": {"total": 0, "new": 0},
-            "2nd_dose": {"total": 0, "new": 0},
-            "3rd_dose": {"total": 0, "new": 0},
-        },
 
-        "18+": {
-            "all_doses": {"total": 0, "new": 0},
-            "1st_dose": {"total": 0, "new": 0},
-            "2nd_dose": {"total": 0, "new": 0},
-            "3rd_dose": {"total": 0, "new": 0},
-        },
+def main() -> None:
+    """Fetch the data, and store it in the output folder."""
 
-        "15-18": {
-            "all_doses": {"total": 0, "new": 0},
-            "1st_dose": {"total": 0, "new": 0},
-            "2nd_dose": {"total": 0, "new": 0},
-            "3rd_dose": {"total": 0, "new": 0},
-        },
+    args = parse_args()
+    start_run()
 
-        "12-14": {
-            "all_doses": {"total": 0, "new": 0},
-            "1st_dose": {"total": 0, "new": 0},
-            "2nd_dose": {"total": 0, "new": 0},
-            "3rd_dose": {"total": 0, "new": 0},
-        },
-    },
+    # Stop the run if it takes more than 15 minutes (say, due to stalled
+    # servers).
+    set_deadline(15 * 60)
 
-    "districts": {}
-}
+    # From here on, time the stages and write the metrics even if we fail
+    # (or exit early, which is recorded as skipped).
+    status = "failed"
 
-# For data not linked to any state.
-pretty["Miscellaneous"] = copy.deepcopy(pretty["All"])  # Copying defaults.
-pretty["Miscellaneous"]["abbr"] = "misc"
-pretty["Miscellaneous"]["hindi"] = "इत्यादि"
-pretty["Miscellaneous"]["helpline"] = ""
-pretty["Miscellaneous"]["donate"] = ""
+    try:
+        if not args.replay and already_fetched(args.output):
+            print("Data already fetched for today, exiting.")
+            status = "skipped"
+            return
 
+        pretty = make_pretty(args.output, args.replay,
+                             args.pdf_rss_limit, args.pdf_time_limit)
 
-# Fill the dictionary.
-fill_cases(pretty)  # Will also update pretty["internal"]["yesterday"]
-fill_vaccination(pretty)
-fill_district_data(pretty)
+        # Check if anything has changed upstream since the last run, before
+        # doing any heavy work. This only fetches the cases JSONs.
+        if not args.replay and not probe_upstream(pretty):
+            print("No new data upstream since the last run, exiting.")
+            status = "skipped"
+            return
 
-# Move Miscellaneous at the end, get yesterday, and delete the "internal" dict.
-pretty["Miscellaneous"] = pretty.pop("Miscellaneous")
-yesterday = pretty["internal"]["yesterday"]
-del pretty["internal"]
+        # Names of states and districts resolved in earlier runs.
+        load_aliases()
 
+        # Start downloading all the sources concurrently (including the links
+        # from the MoHFW website). The fill functions below will wait for
+        # their payloads.
+        fetch_sources(pretty)
 
-# Save the data in JSON, and make "latest.json" symlink point to it.
+        # Fill the stats.
+        fill_cases(pretty)  # Will also update pretty["internal"]["yesterday"]
+        fill_vaccination(pretty)
+        fill_district_data(pretty)
 
-Path(f"../saarani/Daily/{yesterday.format('YYYY_MM_DD')}.json").write_text(
-    json.dumps(pretty, indent=4)
-)
-
-latest.unlink(missing_ok=True)
-latest.symlink_to(Path(f"./Daily/{yesterday.format('YYYY_MM_DD')}.json"))
-
-
-# Make dashboard json (an unnested json).
-
-dashboard = []
-
-for state in pretty.keys():
-    if state == "timestamp":
-        continue
-
-    vaccination_all = pretty[state]["vaccination"]["all_ages"]["all_doses"]
-
-    dashboard.append({
-        "State": "All over India" if state == "All" else state,
+        # Move Miscellaneous at the end, get yesterday, and delete the
+        # "internal" dict.
+        pretty["Miscellaneous"] = pretty.pop("Miscellaneous")
+        yesterday = pretty["internal"]["yesterday"]
+        fingerprint = pretty["internal"].get("fingerprint")  # If probed.
+        stats = pretty["internal"]["stats"]
+        old_filename = pretty["internal"]["old_filename"]
+        del pretty["internal"]
 
-        "Active (Total)": pretty[state]["active"]["current"],
-        "Active (Change)": pretty[state]["active"]["delta"],
-
-        "Recovered (Total)": pretty[state]["recovered"]["current"],
-        "Recovered (Change)": pretty[state]["recovered"]["delta"],
+        # Make the dicts of the regions from the stored stats. The records
+        # of the regions are kept for the time series.
+        regions = pretty
+        with span("serialize/stats"):
+            pretty = stats.to_pretty(pretty)
 
-        "Deaths (Total)": pretty[state]["deaths"]["current"],
-        "Deaths (Change)": pretty[state]["deaths"]["delta"],
+        write_outputs(pretty, yesterday, args.output, old_filename)
 
-        "Overall (Total)": pretty[state]["confirmed"]["current"],
-        "Overall (Change)": pretty[state]["confirmed"]["delta"],
+        # Add the day to the time series of the regions, only once the daily
+        # file is there.
+        with span("write/timeseries"):
+            append_timeseries(regions, stats, yesterday, args.output)
+        status = "ok"
 
-        "Vaccinations (Total)": vaccination_all["total"],
-        "Vaccinations (New)": vaccination_all["new"],
-    })
+    finally:
+        print(f"Metrics written to {write_metrics(args.metrics, status)}")
 
-# Save dashboard in "dashboard.json".
-Path("../saarani/dashboard.json").write_text(json.dumps(dashboard, indent=4))
+    # All done, so remember what upstream data we used (for the next probe),
+    # and the names we resolved.
+    if fingerprint is not None:
+        save_fingerprint(fingerprint)
+    save_aliases()
+# End of main().
+
+
+if __name__ == "__main__":
+    main()
 
 
 # End of file.